@@ -0,0 +1,43 @@
+import asyncio
+import shlex
+import time
+
+from libqtile.log_utils import logger
+from libqtile.utils import create_task
+
+# name -> {"start_ms", "runtime_ms", "status"} for everything launched at startup
+results = {}
+
+
+async def _run(name, command, started):
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *command, stdin=asyncio.subprocess.DEVNULL
+        )
+    except OSError as e:
+        logger.error(f"Autostart {name} failed to launch: {e}")
+        results[name] = {"start_ms": None, "runtime_ms": None, "status": None}
+        return
+    launched = time.monotonic()
+    result = results[name] = {
+        "start_ms": round((launched - started) * 1000, 1),
+        "runtime_ms": None,
+        "status": None,
+    }
+    result["status"] = await proc.wait()
+    result["runtime_ms"] = round((time.monotonic() - launched) * 1000, 1)
+    if result["status"]:
+        logger.warning(f"Autostart {name} exited with status {result['status']}")
+    else:
+        logger.info(
+            f"Autostart {name} started after {result['start_ms']}ms, "
+            f"ran for {result['runtime_ms']}ms"
+        )
+
+
+def start(script, commands=()):
+    started = time.monotonic()
+    if script.exists():
+        create_task(_run(script.name, [script.as_posix()], started))
+    for command in commands:
+        create_task(_run(command, shlex.split(command), started))
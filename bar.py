@@ -1,14 +1,23 @@
-from datetime import datetime, timedelta
+from functools import partial
 
 from libqtile import bar, qtile
 from libqtile.config import Screen
 from libqtile.log_utils import logger
+from libqtile.widget import base
 from qtile_extras import widget
 from qtile_extras.widget.decorations import PowerLineDecoration
 
-from group_config import get_num_monitors, group_screen, groups_list
-from theme import colors, powerline_colors
-from variables import laptop, terminal, widget_style
+import metrics
+from group_config import screen_groups
+from launcher import Launcher
+from media import toggle_mute
+from monitors import get_num_monitors
+from nightscout import Nightscout
+from pool import hand_out
+from profiling import profiled
+from tasks import TaskList
+from theme import colors, on_change, paint, powerline_colors
+from variables import laptop, nightscout_url, widget_style
 
 
 powerline = {"decorations": [PowerLineDecoration(path="arrow_right", size=10)]}
@@ -22,6 +31,7 @@ bar_widget_defaults = dict(
 )
 
 
+@profiled
 def make_widgets(screen):
     if widget_style == "powerline":
         return make_widgets_powerline(screen)
@@ -31,61 +41,100 @@ def make_widgets(screen):
         return make_widgets_powerline(screen)
 
 
+def damage_key(w):
+    # everything that ends up in the widget's pixmap, decorations included
+    next_colours = tuple(
+        d.set_next_colour()
+        for d in getattr(w, "decorations", [])
+        if isinstance(d, PowerLineDecoration)
+    )
+    return (w.text, w.foreground, w.background, w.length, w.bar.size, next_colours)
+
+
+def track_damage(w):
+    # Only re-render a text widget when its content changed. Otherwise the
+    # pixmap from the last draw is still valid and only needs to be copied
+    # to the (possibly moved) offset, which is all a full bar redraw needs.
+    if not isinstance(w, base._TextBox) or getattr(w, "mode", "text") != "text":
+        # icon modes draw images that the text doesn't describe
+        return
+    draw = w.draw
+
+    def damaged_draw():
+        if not w.can_draw():
+            return
+        key = damage_key(w)
+        cached = getattr(w.drawer, "_xcb_surface", None) is not None
+        if cached and key == w.damage_key:
+            w.drawer.draw(
+                offsetx=w.offsetx, offsety=w.offsety, width=w.width, height=w.height
+            )
+            return
+        w.damage_key = key
+        draw()
+
+    w.damage_key = None
+    w.draw = damaged_draw
+
+
 def make_powerline(widgets):
     powerline = []
     odd = len(widgets) % 2
     for i, w in enumerate(widgets):
         index = (i + 1 - odd) % len(powerline_colors)
-        bg = powerline_colors[index]["bg"]
-        fg = powerline_colors[index]["fg"]
-        if type(w) is list:
-            for w2 in w:
-                w2.background = bg
-                w2.foreground = fg
-                powerline.append(w2)
-        else:
-            w.background = bg
-            w.foreground = fg
-            powerline.append(w)
+        for w2 in w if type(w) is list else [w]:
+            paint(
+                w2,
+                background=f"powerline-{index}-bg",
+                foreground=f"powerline-{index}-fg",
+            )
+            track_damage(w2)
+            powerline.append(w2)
     return powerline
 
 
 def make_widgets_powerline(screen):
     widget_list = [
         widget.Sep(linewidth=0, padding=6),
-        widget.GroupBox(
-            font="Source Code Pro Bold",
-            margin_y=3,
-            margin_x=0,
-            padding_y=5,
-            padding_x=3,
-            borderwidth=3,
-            active=colors["active-group-foreground"],
-            inactive=colors["active-group-foreground"],
-            rounded=False,
-            highlight_method="block",
-            this_current_screen_border=colors["current-group-background"],
-            this_screen_border=colors["other-screen-group-background"],
-            other_current_screen_border=colors["current-group-background"],
-            other_screen_border=colors["other-screen-group-background"],
-            use_mouse_wheel=False,
-            hide_unused=True,
-            disable_drag=True,
-            toggle=False,
-            visible_groups=[
-                group.name for group in groups_list if group_screen(group) == screen
-            ],
+        paint(
+            widget.GroupBox(
+                font="Source Code Pro Bold",
+                margin_y=3,
+                margin_x=0,
+                padding_y=5,
+                padding_x=3,
+                borderwidth=3,
+                rounded=False,
+                highlight_method="block",
+                use_mouse_wheel=False,
+                hide_unused=True,
+                disable_drag=True,
+                toggle=False,
+                visible_groups=screen_groups(screen),
+            ),
+            active="active-group-foreground",
+            inactive="active-group-foreground",
+            this_current_screen_border="current-group-background",
+            this_screen_border="other-screen-group-background",
+            other_current_screen_border="current-group-background",
+            other_screen_border="other-screen-group-background",
+            urgent_border="urgent",
+            urgent_text="urgent",
         ),
-        widget.TaskList(
-            rounded=False,
-            highlight_method="block",
-            margin_y=0,
-            margin_x=0,
-            padding_y=4,
-            padding_x=3,
-            borderwidth=3,
-            icon_size=0,
-            border=colors["active"],
+        paint(Launcher(record_history=False, padding=5), cursor_color="active"),
+        paint(
+            TaskList(
+                rounded=False,
+                highlight_method="block",
+                margin_y=0,
+                margin_x=0,
+                padding_y=4,
+                padding_x=3,
+                borderwidth=3,
+                icon_size=0,
+            ),
+            border="active",
+            urgent_border="urgent",
         ),
         widget.Sep(
             linewidth=0,
@@ -94,39 +143,30 @@ def make_widgets_powerline(screen):
         ),
     ]
     pl_list = [
-        widget.CPU(
+        metrics.CPU(
             format="CPU {load_percent}%",
             padding=6,
             **powerline,
         ),
-        widget.Memory(
+        metrics.Memory(
             format="{MemUsed: .0f}{mm} /{MemTotal: .0f}{mm}",
-            mouse_callbacks={"Button1": lambda: qtile.spawn(terminal + " -e btop")},
+            mouse_callbacks={"Button1": lambda: hand_out("btop")},
             padding=5,
             **powerline,
         ),
-        widget.Net(
+        metrics.Net(
             format="{down:.2f}{down_suffix} ↓↑ {up:.2f}{up_suffix}",
             prefix="M",
             padding=5,
             **powerline,
         ),
-        # widget.GenPollUrl(
-        #     url="http://localhost:1337/api/v1/entries/sgv?count=1",
-        #     headers={"accept": "application/json"},
-        #     parse=parse_nightscout,
-        #     update_interval=150,
-        #     json=True,
-        # ),
         widget.PulseVolume(
             unmute_format="󰕾 {volume}%",
             mute_format="󰝟 0%",
             padding=5,
             mouse_callbacks={
                 "Button1": lambda: qtile.spawn("pavucontrol"),
-                "Button3": lambda: qtile.spawn(
-                    "wpctl set-mute @DEFAULT_AUDIO_SINK@ toggle"
-                ),
+                "Button3": toggle_mute,
             },
             step=5,
             **powerline,
@@ -140,6 +180,8 @@ def make_widgets_powerline(screen):
             font="Source Code Pro Bold",
             padding=5,
             format="%A, %B %d - %H:%M ",
+            # the format has minute resolution, tick on the minute
+            update_interval=60,
         ),
     ]
 
@@ -157,8 +199,13 @@ def make_widgets_powerline(screen):
 
     if screen == get_num_monitors() - 1:
         pl_list.insert(-1, systray)
+    if nightscout_url:
+        pl_list.insert(
+            3,
+            Nightscout(url=nightscout_url, update_interval=150, padding=5, **powerline),
+        )
     if laptop:
-        battery_widget = widget.Battery(
+        battery_widget = metrics.Battery(
             format="  {percent:2.0%} {char}{hour:d}:{min:02d}",
             charge_char="+",
             discharge_char="-",
@@ -168,46 +215,39 @@ def make_widgets_powerline(screen):
         )
         pl_list.insert(3, battery_widget)
 
+    for w in widget_list:
+        paint(w, foreground="foreground", background="background")
     widget_list += make_powerline(pl_list)
     return widget_list
 
 
-def parse_nightscout(data):
-    dtime = datetime.now() - datetime.fromtimestamp(data[0]["date"] / 1000)
-    if dtime > timedelta(minutes=15):
-        return "-- No data"
-    glucose = data[0]["sgv"]
-    direction = data[0]["direction"]
-    delta = data[0]["delta"]
-    if direction == "Flat":
-        arrow = "󰁕"
-    elif direction == "FortyFiveUp":
-        arrow = "󰧆"
-    elif direction == "SingleUp":
-        arrow = "󰁞"
-    elif direction == "FortyFiveDown":
-        arrow = "󰦺"
-    elif direction == "SingleDown":
-        arrow = "󰁆"
-    elif direction == "DoubleUp":
-        arrow = "󰁞󰁞"
-    elif direction == "DoubleDown":
-        arrow = "󰁆󰁆"
-
-    if delta >= 0:
-        delta_s = f"+{delta:.0f}mg/dL "
-    elif delta < 0:
-        delta_s = f"{delta:.0f}mg/dL "
-    else:
-        delta_s = ""
+class LazyBar(bar.Bar):
+    # Builds its widgets the first time a screen shows the bar, so a monitor
+    # that never shows up costs nothing. The pulse connection and the metrics
+    # sampler are shared and only start once a widget using them is configured.
+    def __init__(self, build_widgets, size, **config):
+        bar.Bar.__init__(self, [], size, **config)
+        self.build_widgets = build_widgets
+
+    def _configure(self, qtile, screen, reconfigure=False):
+        if self.build_widgets is not None:
+            self.widgets = self.build_widgets()
+            self.build_widgets = None
+        bar.Bar._configure(self, qtile, screen, reconfigure)
+
 
-    return f"{arrow} {glucose} {delta_s}"
+@on_change
+def _repaint_bars():
+    for screen in qtile.screens:
+        if isinstance(screen.top, bar.Bar) and screen.top.widgets:
+            screen.top.draw()
 
 
 screen_list = [
     Screen(
-        top=bar.Bar(
-            widgets=make_widgets(i), size=24, margin=0, background=colors["background"]
+        top=paint(
+            LazyBar(partial(make_widgets, i), size=24, margin=0),
+            background="background",
         )
     )
     for i in range(get_num_monitors())
@@ -0,0 +1,75 @@
+from contextlib import contextmanager
+
+from libqtile.group import _Group
+
+# the method every group really lays out with, kept when reload_config
+# re-executes this module so it never wraps its own wrapper
+_layout_all = globals().get("_layout_all", _Group.layout_all)
+# group -> warp for every group that asked for a relayout during the batch,
+# None while no batch is open
+_dirty = globals().get("_dirty")
+# windows placed by defer() since the event loop was last idle
+_pending = globals().get("_pending", 0)
+
+
+def _batched_layout_all(group, warp=False):
+    if _dirty is None:
+        _layout_all(group, warp)
+    else:
+        _dirty[group] = _dirty.get(group, False) or warp
+
+
+_Group.layout_all = _batched_layout_all
+
+
+def begin():
+    global _dirty
+    if _dirty is not None:
+        return False
+    _dirty = {}
+    return True
+
+
+def commit():
+    global _dirty
+    if _dirty is None:
+        return
+    dirty, _dirty = _dirty, None
+    for group, warp in dirty.items():
+        _layout_all(group, warp)
+
+
+@contextmanager
+def batch():
+    # nested batches join the outer one and commit with it
+    opened = begin()
+    try:
+        yield
+    finally:
+        if opened:
+            commit()
+
+
+def _settled():
+    global _pending
+    _pending = 0
+    commit()
+
+
+def defer(qtile):
+    # a new window is mapped as soon as client_new returns, so the first one
+    # of a loop iteration is laid out right away. Only a burst, e.g. the
+    # client_new events of a session restore read from the X server in one
+    # go, batches the rest until the event loop is idle.
+    global _pending
+    if _pending == 0:
+        qtile.call_soon(_settled)
+    _pending += 1
+    if _pending > 1:
+        begin()
+
+
+def move_windows(moves):
+    with batch():
+        for window, group_name in moves:
+            window.togroup(group_name)
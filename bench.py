@@ -0,0 +1,196 @@
+# Offline benchmarks for the config's lazy functions, run against the fake
+# qtile in fakeqtile.py (real groups and layouts, no X server):
+#
+#   python bench.py [-n iterations] [--screens 3] [--windows 200] [--keys]
+#   python bench.py --save baseline.json
+#   python bench.py --compare baseline.json
+#
+# Results use the same histograms as QTILE_KEY_LATENCY=1 on a live session.
+# isort: skip_file
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import fakeqtile
+import latency
+
+# before the config modules, they bind libqtile.qtile when imported
+qtile = fakeqtile.install()
+
+from bar import make_widgets
+from config import (
+    add_column,
+    floating_layout,
+    layouts,
+    my_keys,
+    next_window,
+    prev_window,
+    remove_column,
+    side,
+)
+from group_config import (
+    build_routing,
+    go_to_group,
+    groups_list,
+    next_group_in_screen,
+    screen_groups,
+)
+from nightscout import parse_nightscout
+import media
+import pool
+
+# a p50 this much slower than the baseline counts as a regression
+REGRESSION = 1.25
+
+
+def raw(command):
+    # the plain function behind a lazy.function call
+    return command.args[0]
+
+
+def nightscout_entries():
+    now = time.time() * 1000
+    directions = ["Flat", "FortyFiveUp", "SingleUp", "FortyFiveDown", "SingleDown"]
+    return [
+        [{"date": now, "sgv": 100 + i, "direction": d, "delta": i - 2}]
+        for i, d in enumerate(directions)
+    ]
+
+
+def cases(qtile):
+    names = [group.name for group in groups_list]
+    entries = nightscout_entries()
+    left, right = raw(side(-1)), raw(side(1))
+
+    def toggle_column(qtile):
+        raw(add_column)(qtile)
+        raw(remove_column)(qtile)
+
+    def cycle(values, func):
+        state = {"i": 0}
+
+        def call(qtile):
+            state["i"] += 1
+            return func(qtile, values[state["i"] % len(values)])
+
+        return call
+
+    return {
+        "side(-1)": (left, 1),
+        "side(1)": (right, 1),
+        "next_window": (raw(next_window), 1),
+        "prev_window": (raw(prev_window), 1),
+        "add_column+remove_column": (toggle_column, 1),
+        "go_to_group": (cycle(names, go_to_group), 1),
+        "next_group_in_screen": (
+            cycle(names, lambda q, name: next_group_in_screen(q.groups_map[name], 1)),
+            1,
+        ),
+        # builds every widget of a bar, so far fewer rounds
+        "make_widgets(powerline)": (
+            cycle(range(len(qtile.screens)), lambda q, screen: make_widgets(screen)),
+            0.01,
+        ),
+        "parse_nightscout": (cycle(entries, lambda q, data: parse_nightscout(data)), 1),
+    }
+
+
+def key_cases():
+    for bind, *commands, desc in my_keys:
+        for command in commands:
+            if getattr(command, "name", None) == "function":
+                func, *args = command.args
+
+                def call(qtile, func=func, args=args, kwargs=command.kwargs):
+                    func(qtile, *args, **kwargs)
+
+                yield bind, call, 1
+
+
+def build(args):
+    build_routing(args.screens)
+    shown = [screen_groups(i)[0] for i in range(args.screens)]
+    names = [group.name for group in groups_list] + [pool.GROUP]
+    qtile.setup(layouts, floating_layout, names, args.screens, shown)
+    qtile.populate(args.windows)
+    fakeqtile.install_media(media)
+
+
+async def run(qtile, benchmarks, iterations):
+    latency.histograms.clear()
+    failed = {}
+    for name, (func, scale) in benchmarks.items():
+        timed = latency.timed(name, func)
+        for _ in range(max(1, int(iterations * scale))):
+            try:
+                timed(qtile)
+            except Exception as e:
+                failed[name] = repr(e)
+                break
+            # let batch.defer and friends commit, outside the timing. Tasks
+            # the bindings started never get to run, some would start real
+            # programs (xcolor, the launcher's scan); asyncio.run cancels them.
+            qtile.idle()
+    return latency.report(), failed
+
+
+def compare(result, baseline):
+    regressions = []
+    for name, summary in result.items():
+        before = baseline.get(name)
+        if before and summary["p50_us"] > before["p50_us"] * REGRESSION:
+            regressions.append(
+                f"{name}: p50 {before['p50_us']}us -> {summary['p50_us']}us"
+            )
+    return regressions
+
+
+def print_report(result, failed):
+    width = max((len(name) for name in result), default=0)
+    print(
+        f"{'benchmark':<{width}}  {'n':>7}  {'p50 us':>9}  {'p99 us':>9}  "
+        f"{'max us':>9}"
+    )
+    for name, s in result.items():
+        print(
+            f"{name:<{width}}  {s['count']:>7}  {s['p50_us']:>9}  "
+            f"{s['p99_us']:>9}  {s['max_us']:>9}"
+        )
+    for name, error in failed.items():
+        print(f"{name}: failed with {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--iterations", type=int, default=1000)
+    parser.add_argument("--screens", type=int, default=3)
+    parser.add_argument("--windows", type=int, default=200)
+    parser.add_argument("--keys", action="store_true", help="run every key binding")
+    parser.add_argument("--save", type=Path)
+    parser.add_argument("--compare", type=Path)
+    args = parser.parse_args()
+
+    build(args)
+    if args.keys:
+        benchmarks = {bind: (func, scale) for bind, func, scale in key_cases()}
+    else:
+        benchmarks = cases(qtile)
+    # the key bindings start asyncio tasks, which need a running loop
+    result, failed = asyncio.run(run(qtile, benchmarks, args.iterations))
+    print_report(result, failed)
+
+    if args.save:
+        args.save.write_text(json.dumps(result, indent=2))
+    if args.compare:
+        regressions = compare(result, json.loads(args.compare.read_text()))
+        for line in regressions:
+            print(f"regression: {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
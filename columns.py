@@ -0,0 +1,118 @@
+from libqtile import layout
+
+
+class Columns(layout.Columns):
+    # qtile's Columns, but the geometry of the whole layout is worked out in
+    # one pass and only windows whose geometry or border actually changed are
+    # placed again. A relayout after a focus change or a resize then touches
+    # a few windows instead of reconfiguring every window in the group.
+
+    def plan(self, screen_rect):
+        # client -> (x, y, width, height, border, split, margin), None if hidden
+        plan = {}
+        num_columns = len(self.columns)
+        pos = 0
+        for col in self.columns:
+            is_single = num_columns == 1 and (len(col) == 1 or not col.split)
+            border = self.single_border_width if is_single else self.border_width
+            margin = self.margin_on_single if is_single else self.margin
+            width = int(0.5 + col.width * screen_rect.width * 0.01 / num_columns)
+            x = screen_rect.x + int(0.5 + pos * screen_rect.width * 0.01 / num_columns)
+            pos += col.width
+            if col.split:
+                offset = 0
+                for client in col:
+                    height = int(
+                        0.5 + col.heights[client] * screen_rect.height * 0.01 / len(col)
+                    )
+                    y = screen_rect.y + int(
+                        0.5 + offset * screen_rect.height * 0.01 / len(col)
+                    )
+                    offset += col.heights[client]
+                    plan[client] = (
+                        x,
+                        y,
+                        width - 2 * border,
+                        height - 2 * border,
+                        border,
+                        True,
+                        margin,
+                    )
+            else:
+                for client in col:
+                    plan[client] = None
+                if col.cw is not None:
+                    plan[col.cw] = (
+                        x,
+                        screen_rect.y,
+                        width - 2 * border,
+                        screen_rect.height - 2 * border,
+                        border,
+                        False,
+                        margin,
+                    )
+        return plan
+
+    def layout(self, windows, screen_rect):
+        plan = self.plan(screen_rect)
+        for client in windows:
+            self.place_client(client, plan.get(client))
+
+    def configure(self, client, screen_rect):
+        self.place_client(client, self.plan(screen_rect).get(client))
+
+    def place_client(self, client, target):
+        if target is None:
+            if not client.hidden:
+                client.hide()
+            return
+        x, y, width, height, border, split, margin = target
+        if client.has_focus:
+            color = self.border_focus if split else self.border_focus_stack
+        else:
+            color = self.border_normal if split else self.border_normal_stack
+        if not client.hidden and self.is_placed(
+            client, x, y, width, height, border, color, margin
+        ):
+            return
+        client.place(x, y, width, height, border, color, margin=margin)
+        client.unhide()
+
+    def is_placed(self, client, x, y, width, height, border, color, margin):
+        # compare with the window itself rather than a cache, the group hides
+        # and other code moves windows without going through the layout
+        if isinstance(margin, int):
+            margin = [margin] * 4
+        return (
+            client.x == x + margin[3]
+            and client.y == y + margin[0]
+            and client.width == width - margin[1] - margin[3]
+            and client.height == height - margin[0] - margin[2]
+            and client.borderwidth == border
+            and client.bordercolor == color
+        )
+
+    def set_num_columns(self, num_columns):
+        # move windows so the group shows the new number of columns now,
+        # not just when the next window is added
+        self.num_columns = max(num_columns, 1)
+        while len(self.columns) > self.num_columns:
+            col = self.columns[-1]
+            for client in list(col):
+                col.remove(client)
+                target = self.columns[-2]
+                if self.fair:
+                    target = min(self.columns[:-1], key=len)
+                target.add_client(client)
+            self.remove_column(col)
+        while len(self.columns) < self.num_columns:
+            source = max(self.columns, key=len)
+            if len(source) < 2:
+                break
+            client = source.clients[-1]
+            source.remove(client)
+            self.add_column().add_client(client)
+        # keep the layout's current column on the focused window
+        current = self.group.current_window
+        if current is not None:
+            self.focus(current)
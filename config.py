@@ -1,16 +1,34 @@
-import subprocess
+import asyncio
+import re
+import tempfile
+from pathlib import Path
 
 from libqtile import hook, layout, qtile
-from libqtile.config import Click, Drag, EzKey, Match
+from libqtile.config import Click, Drag, EzKey
 from libqtile.lazy import lazy
 from libqtile.log_utils import logger
-
+from libqtile.utils import create_task
+
+# imported first so it can time the config modules below
+import profiling  # isort: skip
+import autostart
+import batch
+import columns
+import latency
+import launcher
+import media
+import pool
+import session
+import urgency  # noqa: F401
 from bar import bar_widget_defaults, screen_list
-from group_config import go_to_group, group_keys, groups_list
-from theme import colors
-from variables import file_manager, qtile_dir, terminal
+from focus_history import focus_recent
+from geometry import window_at
+from group_config import group_keys, groups_list
+from rules import Rule, RuleEngine
+from theme import colors, on_change
+from variables import autostart_commands, file_manager, qtile_dir
 
-groups = groups_list
+groups = groups_list + [pool.group]
 
 mod = "mod4"
 EzKey.modifier_keys = {
@@ -72,17 +90,13 @@ def side(direction):
             return
 
         # if the previously focused window is not next to the current window,
-        # loop through all windows in next column
-        # and focus the one that is next to the middle of the current window
-        for i, win in enumerate(layout.cc.clients):
-            next_top = win.get_position()[1] - (layout.margin + layout.border_width) * 2
-            next_bottom = (
-                next_top + win.get_size()[1] + (layout.margin + layout.border_width) * 2
-            )
-            if next_top <= current_middle <= next_bottom:
-                layout.cc.current_index = i
-                qtile.current_group.focus(win, True)
-                return
+        # focus the window in the next column that is next to the middle
+        # of the current window
+        pad = (layout.margin + layout.border_width) * 2
+        hit = window_at(qtile.current_group, layout.cc, current_middle, pad)
+        if hit:
+            layout.cc.current_index, win = hit
+            qtile.current_group.focus(win, True)
 
     return _side
 
@@ -92,7 +106,7 @@ def add_column(qtile):
     layout = qtile.current_layout
     if layout.name != "columns":
         return
-    layout.num_columns += 1
+    layout.set_num_columns(layout.num_columns + 1)
     qtile.current_group.layout_all()
 
 
@@ -101,7 +115,8 @@ def remove_column(qtile):
     layout = qtile.current_layout
     if layout.name != "columns" or layout.num_columns <= 1:
         return
-    layout.num_columns -= 1
+    layout.set_num_columns(layout.num_columns - 1)
+    qtile.current_group.layout_all()
 
 
 @lazy.function
@@ -151,18 +166,62 @@ def prev_window(qtile):
         group.focus(prev, True)
 
 
-@lazy.function
-def pick_color(qtile):
+# what xcolor prints by default, anything else isn't rendered or copied
+hex_color = re.compile(r"#[0-9a-fA-F]{6}")
+
+
+def color_swatch(color):
+    # swatches are cached on tmpfs by hex value, so each color renders once
+    swatch = Path(tempfile.gettempdir()) / "qtile-swatches" / f"{color[1:]}.png"
+    if not swatch.exists():
+        try:
+            from PIL import Image
+        except ImportError:
+            logger.error("PIL is not installed")
+            return None
+        swatch.parent.mkdir(exist_ok=True)
+        Image.new("RGB", (100, 100), color).save(swatch)
+    return swatch.as_posix()
+
+
+async def _pick_color(qtile):
     try:
-        from PIL import Image
+        picker = await asyncio.create_subprocess_exec(
+            "xcolor", stdout=asyncio.subprocess.PIPE
+        )
+    except FileNotFoundError:
+        logger.error("xcolor is not installed")
+        return
+    output, _ = await picker.communicate()
+    color = output.decode("utf-8").strip()
+    if picker.returncode != 0 or not color:
+        # picker was cancelled
+        return
+    if not hex_color.fullmatch(color):
+        logger.warning(f"Unexpected xcolor output: {color!r}")
+        qtile.spawn(["dunstify", "Color picker", f"Unexpected output: {color}"])
+        return
+
+    loop = asyncio.get_running_loop()
+    swatch = await loop.run_in_executor(None, color_swatch, color)
+    notify = ["dunstify", color]
+    if swatch:
+        notify += ["-i", swatch]
+    qtile.spawn(notify)
+
+    try:
+        clip = await asyncio.create_subprocess_exec(
+            "xclip", "-sel", "clip", stdin=asyncio.subprocess.PIPE
+        )
+    except FileNotFoundError:
+        logger.error("xclip is not installed")
+        return
+    await clip.communicate(color.encode("utf-8"))
+
 
-        color = subprocess.check_output("xcolor").decode("utf-8").strip()
-        image = Image.new("RGB", (100, 100), color)
-        image.save("/tmp/color.png")
-        qtile.spawn(["dunstify", color, "-i", "/tmp/color.png"])
-        qtile.spawn(f"echo -n \\{color} | xclip -sel clip", shell=True)
-    except ImportError:
-        logger.error("PIL is not installed")
+@lazy.function
+def pick_color(qtile):
+    create_task(_pick_color(qtile))
 
 
 my_keys = [
@@ -171,6 +230,7 @@ my_keys = [
     ["M-k", prev_window, lazy.window.move_to_top(), "Move focus prev"],
     ["M-h", side(direction=-1), "Move focus left"],
     ["M-l", side(direction=1), "Move focus right"],
+    ["A-<Tab>", focus_recent(1), "Focus previously focused window"],
     ["M-S-h", lazy.layout.shuffle_left().when(layout="columns"), "Move window left"],
     ["M-S-l", lazy.layout.shuffle_right().when(layout="columns"), "Move window right"],
     ["M-S-j", lazy.layout.shuffle_down().when(layout="columns"), "Move window down"],
@@ -186,20 +246,16 @@ my_keys = [
     ["M-f", lazy.window.toggle_floating(), "toggle floating"],
     ["M-S-f", lazy.window.toggle_fullscreen(), "toggle fullscreen"],
     # Launch keys
-    ["M-e", lazy.spawn(terminal), "Launch Terminal"],
-    ["M-b", lazy.spawn(terminal + " -e btop"), "Launch BTOP"],
+    ["M-e", pool.take("terminal"), "Launch Terminal"],
+    ["M-b", pool.take("btop"), "Launch BTOP"],
     ["M-m", lazy.spawn(file_manager), "Launch File manager"],
     ["M-y", lazy.spawn("steam steam://open/friends"), "Launch Steam Friends"],
     ["M-w", lazy.spawn("firefox"), "Launch Firefox"],
     ["M-S-w", lazy.spawn("firefox -private-window"), "Launch Private Firefox"],
     ["M-g", lazy.spawn("qalculate-gtk"), "Launch Calculator"],
     ["M-S-e", lazy.spawn("copyq toggle"), "toggle Copyq"],
-    ["M-r", lazy.spawn("rofi -show run -i", shell=True), "Run Launcher"],
-    [
-        "M-S-r",
-        lazy.spawn("rofi -show drun -i", shell=True),
-        "Application Launcher",
-    ],
+    ["M-r", launcher.open_launcher("run"), "Run Launcher"],
+    ["M-S-r", launcher.open_launcher("app"), "Application Launcher"],
     ["M-v", lazy.spawn("edit_configs"), "Config Launcher"],
     ["M-c", lazy.spawn("edit_repos"), "Repos Launcher"],
     ["<Print>", lazy.spawn("flameshot gui"), "Take Screenshot"],
@@ -214,42 +270,18 @@ my_keys = [
     ["M-<F1>", lazy.spawn("powermenu"), "Logout Menu"],
     ["M-<F2>", lazy.spawn("systemctl suspend"), "Suspend"],
     # Media keys
-    [
-        "<XF86AudioRaiseVolume>",
-        lazy.spawn("wpctl set-volume @DEFAULT_AUDIO_SINK@ 5%+"),
-        "Raise volume by 5%",
-    ],
-    [
-        "<XF86AudioLowerVolume>",
-        lazy.spawn("wpctl set-volume @DEFAULT_AUDIO_SINK@ 5%-"),
-        "Lower volume by 5%",
-    ],
-    [
-        "<XF86AudioMute>",
-        lazy.spawn("wpctl set-mute @DEFAULT_AUDIO_SINK@ toggle"),
-        "Toggle Mute",
-    ],
-    [
-        "S-<XF86AudioPlay>",
-        lazy.spawn("wpctl set-mute @DEFAULT_AUDIO_SINK@ toggle"),
-        "Toggle Mute",
-    ],
-    [
-        "<XF86AudioPlay>",
-        lazy.spawn("playerctl --player playerctld play-pause"),
-        "Play/Pause",
-    ],
-    [
-        "<XF86AudioPause>",
-        lazy.spawn("playerctl --player playerctld play-pause"),
-        "Play/Pause",
-    ],
-    ["<XF86AudioNext>", lazy.spawn("playerctl --player playerctld next"), "Next"],
-    ["<XF86AudioPrev>", lazy.spawn("playerctl --player playerctld previous"), "Next"],
+    ["<XF86AudioRaiseVolume>", media.volume(5), "Raise volume by 5%"],
+    ["<XF86AudioLowerVolume>", media.volume(-5), "Lower volume by 5%"],
+    ["<XF86AudioMute>", media.mute, "Toggle Mute"],
+    ["S-<XF86AudioPlay>", media.mute, "Toggle Mute"],
+    ["<XF86AudioPlay>", media.player("PlayPause"), "Play/Pause"],
+    ["<XF86AudioPause>", media.player("PlayPause"), "Play/Pause"],
+    ["<XF86AudioNext>", media.player("Next"), "Next"],
+    ["<XF86AudioPrev>", media.player("Previous"), "Next"],
     # ["<XF86AudioNext>", lazy.spawn("xdotool key ctrl+alt+period"), "Mute discord"],
     # ["<XF86AudioPrev>", lazy.spawn("xdotool key ctrl+alt+comma"), "Deafen discord"],
-    ["M-p", lazy.spawn("playerctl --player playerctld play-pause"), "Play/Pause"],
-    ["M-n", lazy.spawn("playerctl --player playerctld next"), "Next"],
+    ["M-p", media.player("PlayPause"), "Play/Pause"],
+    ["M-n", media.player("Next"), "Next"],
     # debug keys
     ["M-S-g", debug_function, "Debug function"],
     # autoclicker
@@ -261,18 +293,24 @@ my_keys = [
 
 my_keys += group_keys
 
-keys = [EzKey(bind, *cmd, desc=desc) for bind, *cmd, desc in my_keys]
+with profiling.timed("keys"):
+    keys = [
+        EzKey(bind, *latency.instrument(bind, cmd), desc=desc)
+        for bind, *cmd, desc in my_keys
+    ]
+
+# layout border attribute -> theme color
+border_colors = {"border_focus": "active", "border_normal": "inactive"}
 
 layout_theme = {
     "border_width": 2,
     "margin": 2,
-    "border_focus": colors["active"],
-    "border_normal": colors["inactive"],
     "border_on_single": True,
+    **{attribute: colors[key] for attribute, key in border_colors.items()},
 }
 
 layouts = [
-    layout.Columns(**layout_theme, insert_position=1, fair=True, num_columns=2),
+    columns.Columns(**layout_theme, insert_position=1, fair=True, num_columns=2),
     layout.Max(),
 ]
 
@@ -303,25 +341,28 @@ bring_front_click = False
 cursor_warp = False
 floats_kept_above = True
 floating_layout = layout.Floating(
-    float_rules=[
-        # Run the utility of `xprop` to see the wm class and name of an X client.
-        *layout.Floating.default_float_rules,
-        Match(wm_class="copyq"),
-        Match(wm_class="qalculate-gtk"),
-        Match(title="Friends List", wm_class="steam"),
-        # Match(wm_class="pavucontrol"),
-        Match(wm_class="confirmreset"),  # gitk
-        Match(wm_class="makebranch"),  # gitk
-        Match(wm_class="maketag"),  # gitk
-        Match(wm_class="ssh-askpass"),  # ssh-askpass
-        Match(title="branchdialog"),  # gitk
-        Match(title="pinentry"),  # GPG key password entry
-        Match(wm_class="Arandr"),
-        Match(wm_class="feh"),
-    ],
-    border_focus=colors["active"],
-    border_normal=colors["inactive"],
+    # custom rules live in window_rules, qtile only checks its defaults
+    float_rules=layout.Floating.default_float_rules,
     border_width=2,
+    **{attribute: colors[key] for attribute, key in border_colors.items()},
+)
+# Run the utility of `xprop` to see the wm class and name of an X client.
+window_rules = RuleEngine(
+    [
+        Rule(wm_class="copyq", floating=True),
+        Rule(wm_class="qalculate-gtk", floating=True),
+        Rule(title="Friends List", wm_class="steam", floating=True),
+        # Rule(wm_class="pavucontrol", floating=True),
+        Rule(wm_class="confirmreset", floating=True),  # gitk
+        Rule(wm_class="makebranch", floating=True),  # gitk
+        Rule(wm_class="maketag", floating=True),  # gitk
+        Rule(wm_class="ssh-askpass", floating=True),  # ssh-askpass
+        Rule(title="branchdialog", floating=True),  # gitk
+        Rule(title="pinentry", floating=True),  # GPG key password entry
+        Rule(wm_class="Arandr", floating=True),
+        Rule(wm_class="feh", floating=True),
+        Rule(wm_class="discord", group="a"),
+    ]
 )
 auto_fullscreen = True
 focus_on_window_activation = "urgent"
@@ -332,6 +373,20 @@ reconfigure_screens = False
 auto_minimize = False
 
 
+@on_change
+def repaint_borders():
+    # groups hold copies of the layouts above, recolor those
+    for group in qtile.groups:
+        for group_layout in [*group.layouts, group.floating_layout]:
+            for attribute, key in border_colors.items():
+                if hasattr(group_layout, attribute):
+                    setattr(group_layout, attribute, colors[key])
+    with batch.batch():
+        for screen in qtile.screens:
+            if screen.group is not None:
+                screen.group.layout_all()
+
+
 @hook.subscribe.startup_once
 def start_once():
     qtile.groups_map["1"].toscreen(0)
@@ -339,32 +394,29 @@ def start_once():
         qtile.groups_map["a"].toscreen(1)
     if len(qtile.screens) > 2:
         qtile.groups_map["z"].toscreen(2)
-    autostart = qtile_dir / "autostart.sh"
-    if autostart.exists():
-        # auto start file generated by nixos
-        subprocess.call([autostart.as_posix()])
+    # auto start file generated by nixos, run without blocking the bars
+    autostart.start(qtile_dir / "autostart.sh", autostart_commands)
     # go_to_group(qtile, "1")
 
 
 @hook.subscribe.client_new
-def set_floating(window):
-    if window.window.get_wm_transient_for():
+def apply_window_rules(window):
+    if pool.adopt(window):
+        return
+    decision = window_rules.decide(window)
+    if decision.floating:
         window.floating = True
-
-
-@hook.subscribe.client_new
-def fix_group(window):
-    if "discord" not in window.get_wm_class():
-        group = qtile.current_group
-        if window.group != group:
-            window.togroup(group.name)
-
-
-@hook.subscribe.client_urgent_hint_changed
-def urgent_hint_changed(window):
-    if window.urgent:
-        go_to_group(qtile, window.group.name)
-        window.focus(False)
+    if session.restoring() and window.group is not None:
+        # existing window being re-managed at startup, the session restore
+        # puts it back where it was
+        return
+    # windows without a rule open on the current group
+    group = qtile.groups_map.get(decision.group) or qtile.current_group
+    if window.group != group:
+        # laid out before it is mapped, unless it is part of a burst (session
+        # restore), which relayouts each group once
+        batch.defer(qtile)
+        window.togroup(group.name)
 
 
 # Gasp! We're lying here. In fact, nobody really uses or cares about this
@@ -376,3 +428,5 @@ def urgent_hint_changed(window):
 # We choose LG3D to maximize irony: it is a 3D non-reparenting WM written in
 # java that happens to be on java's whitelist.
 wmname = "LG3D"
+
+profiling.report()
@@ -0,0 +1,328 @@
+# A headless stand-in for the qtile object model, used by bench.py to run
+# the config's lazy functions without an X server. Groups and layouts are the
+# real libqtile classes, only the X side (windows, screens, core) is faked.
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import libqtile
+from dbus_fast import MessageType
+from libqtile.backend.base import FloatStates
+from libqtile.config import ScreenRect
+from libqtile.group import _Group
+
+BAR_SIZE = 24
+
+
+class FakeWindow:
+    def __init__(self, qtile, wid, name, wm_class, floating=False):
+        self.qtile = qtile
+        self.wid = wid
+        self.name = name
+        self.wm_class = wm_class
+        self.group = None
+        self.x = self.y = 0
+        self.width = 640
+        self.height = 480
+        self.float_x = self.float_y = None
+        self.borderwidth = 0
+        self.bordercolor = None
+        self.hidden = True
+        self.urgent = False
+        self.minimized = False
+        self.maximized = False
+        self.wants_to_fullscreen = False
+        self._float_state = (
+            FloatStates.FLOATING if floating else FloatStates.NOT_FLOATING
+        )
+
+    def __repr__(self):
+        return f"FakeWindow({self.wid}, {self.name!r})"
+
+    @property
+    def floating(self):
+        return self._float_state != FloatStates.NOT_FLOATING
+
+    @property
+    def fullscreen(self):
+        return self._float_state == FloatStates.FULLSCREEN
+
+    @fullscreen.setter
+    def fullscreen(self, value):
+        if value:
+            self._float_state = FloatStates.FULLSCREEN
+        elif self.fullscreen:
+            self._float_state = FloatStates.NOT_FLOATING
+
+    @property
+    def has_focus(self):
+        return self is self.qtile.current_window
+
+    def match(self, rule):
+        return rule.compare(self)
+
+    def get_wm_class(self):
+        return self.wm_class
+
+    def get_wm_type(self):
+        return "normal"
+
+    def get_wm_role(self):
+        return None
+
+    def get_pid(self):
+        return self.wid
+
+    def has_fixed_size(self):
+        return False
+
+    def has_fixed_ratio(self):
+        return False
+
+    def has_user_set_position(self):
+        return False
+
+    def is_transient_for(self):
+        return None
+
+    def get_position(self):
+        return self.x, self.y
+
+    def get_size(self):
+        return self.width, self.height
+
+    def place(
+        self,
+        x,
+        y,
+        width,
+        height,
+        borderwidth,
+        bordercolor,
+        above=False,
+        margin=None,
+        respect_hints=False,
+    ):
+        if margin is not None:
+            if isinstance(margin, int):
+                margin = [margin] * 4
+            x += margin[3]
+            y += margin[0]
+            width -= margin[1] + margin[3]
+            height -= margin[0] + margin[2]
+        self.x, self.y, self.width, self.height = x, y, width, height
+        self.borderwidth = borderwidth
+        self.bordercolor = bordercolor
+        self.qtile.place_count += 1
+        if self.floating and self.group is not None and self.group.screen:
+            self.float_x = x - self.group.screen.x
+            self.float_y = y - self.group.screen.y
+
+    def paint_borders(self, color, width):
+        self.borderwidth = width
+        self.bordercolor = color
+
+    def hide(self):
+        self.hidden = True
+
+    def unhide(self):
+        self.hidden = False
+
+    def focus(self, warp=True):
+        self.qtile.focus_count += 1
+
+    def bring_to_front(self):
+        pass
+
+    def keep_above(self, enable=True):
+        pass
+
+    def togroup(self, group_name=None, switch_group=False, toggle=False):
+        group = self.qtile.groups_map[group_name]
+        if self.group is group:
+            return
+        self.hide()
+        if self.group is not None:
+            self.group.remove(self)
+        group.add(self)
+        if switch_group:
+            group.toscreen()
+
+
+class FakeScreen:
+    def __init__(self, qtile, index, x, y, width, height):
+        self.qtile = qtile
+        self.index = index
+        self.x, self.y, self.width, self.height = x, y, width, height
+        self.group = None
+        self.previous_group = None
+        self.top = self.bottom = self.left = self.right = None
+
+    def __repr__(self):
+        return f"FakeScreen({self.index})"
+
+    def get_rect(self):
+        return ScreenRect(self.x, self.y, self.width, self.height)
+
+    def set_group(self, group, warp=True):
+        # same swapping as libqtile.config.Screen.set_group, minus the bars
+        if group is None or group is self.group:
+            return
+        old = self.group
+        self.previous_group = old
+        other = group.screen
+        self.group = group
+        if old is not None:
+            if other is not None:
+                other.group = old
+                old.set_screen(other, warp)
+            else:
+                old.hide()
+        group.set_screen(self, warp)
+
+    def toggle_group(self, group=None, warp=True):
+        if group in (self.group, None) and self.previous_group:
+            group = self.previous_group
+        self.set_group(group, warp)
+
+
+class FakeQtile:
+    def __init__(self):
+        self.config = SimpleNamespace(
+            auto_fullscreen=True, floats_kept_above=True, cursor_warp=False
+        )
+        self.core = SimpleNamespace(masked=contextmanager(lambda: (yield)))
+        self._drag = False
+        self.focus_count = 0
+        self.place_count = 0
+        self.spawned = []
+        self._soon = []
+        self.screens = []
+        self._current_screen = None
+        self.groups = []
+        self.groups_map = {}
+        self.windows_map = {}
+
+    def setup(self, layouts, floating_layout, group_names, num_screens=3, shown=None):
+        self.screens = [
+            FakeScreen(self, i, i * 1920, BAR_SIZE, 1920, 1080 - BAR_SIZE)
+            for i in range(num_screens)
+        ]
+        self._current_screen = self.screens[0]
+        for name in group_names:
+            group = _Group(name)
+            group._configure(layouts, floating_layout, self)
+            self.groups.append(group)
+            self.groups_map[name] = group
+        for screen, name in zip(self.screens, shown or group_names):
+            screen.set_group(self.groups_map[name])
+
+    def populate(self, num_windows=200, floating_every=10):
+        # spread windows round robin over the groups, every floating_every-th
+        # one floating
+        for i in range(num_windows):
+            group = self.groups[i % len(self.groups)]
+            floating = bool(floating_every) and i % floating_every == floating_every - 1
+            self.new_window(group.name, floating=floating)
+
+    @property
+    def current_screen(self):
+        return self._current_screen
+
+    @property
+    def current_group(self):
+        return self._current_screen.group
+
+    @property
+    def current_layout(self):
+        return self.current_group.layout
+
+    @property
+    def current_window(self):
+        return self.current_group.current_window
+
+    def focus_screen(self, n, warp=True):
+        if 0 <= n < len(self.screens):
+            self._current_screen = self.screens[n]
+
+    def warp_to_screen(self):
+        pass
+
+    def spawn(self, cmd, shell=False):
+        self.spawned.append(cmd)
+        # not a real process, negative like a failed spawn
+        return -len(self.spawned)
+
+    def call_soon(self, func, *args):
+        self._soon.append((func, args))
+
+    def call_later(self, delay, func, *args):
+        # no clock here, due on the next idle() like call_soon
+        entry = (func, args)
+        self._soon.append(entry)
+        return SimpleNamespace(
+            cancel=lambda: entry in self._soon and self._soon.remove(entry)
+        )
+
+    def idle(self):
+        # run whatever was deferred with call_soon, like one event loop pass
+        soon, self._soon = self._soon, []
+        for func, args in soon:
+            func(*args)
+
+    def new_window(self, group_name, wm_class=("fake", "Fake"), floating=False):
+        wid = len(self.windows_map) + 1
+        window = FakeWindow(self, wid, f"{wm_class[1]} {wid}", list(wm_class), floating)
+        self.windows_map[wid] = window
+        self.groups_map[group_name].add(window)
+        return window
+
+
+class FakeSink:
+    def __init__(self, volume=0.5):
+        self.index = 0
+        self.volume = SimpleNamespace(value_flat=volume)
+        self.base_volume = 1.0
+        self.mute = False
+
+
+class FakePulse:
+    # the calls media.py makes on pulsectl_asyncio.PulseAsync, recorded
+    def __init__(self):
+        self.connected = True
+        self.calls = []
+
+    async def volume_set_all_chans(self, sink, volume):
+        self.calls.append(("volume", volume))
+        sink.volume.value_flat = volume
+
+    async def sink_mute(self, index, mute):
+        self.calls.append(("mute", index, mute))
+
+
+class FakeBus:
+    # a session bus where every method call succeeds
+    def __init__(self):
+        self.connected = True
+        self.calls = []
+
+    async def call(self, message):
+        self.calls.append((message.destination, message.member))
+        return SimpleNamespace(message_type=MessageType.METHOD_RETURN)
+
+
+def install():
+    # the config modules bind libqtile.qtile when they are imported, so this
+    # has to run before importing them
+    qtile = FakeQtile()
+    libqtile.init(qtile)
+    return qtile
+
+
+def install_media(media):
+    # point media.py at a pulse server and a session bus that only record
+    # what they are asked to do
+    pulse = FakePulse()
+    media.pulse.pulse = pulse
+    media.pulse.default_sink = FakeSink()
+    media._bus = FakeBus()
+    return pulse, media._bus
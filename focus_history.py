@@ -0,0 +1,81 @@
+from collections import OrderedDict
+
+from libqtile import hook
+from libqtile.lazy import lazy
+
+# group name -> wid -> window, least recently focused first; kept when
+# reload_config re-executes this module
+_history = globals().get("_history", {})
+# wid -> group name, so a closed window is dropped without scanning
+_window_group = globals().get("_window_group", {})
+
+
+def _forget(wid):
+    name = _window_group.pop(wid, None)
+    if name is not None:
+        _history[name].pop(wid, None)
+
+
+def _remember(window, group, recent=True):
+    if _window_group.get(window.wid) != group.name:
+        _forget(window.wid)
+    history = _history.setdefault(group.name, OrderedDict())
+    history[window.wid] = window
+    history.move_to_end(window.wid, last=recent)
+    _window_group[window.wid] = group.name
+
+
+def recent_window(group, n=1):
+    # n=0 is the focused window, n=1 the one before it, and so on
+    history = _history.get(group.name)
+    if not history:
+        return None
+    # walked lazily from the most recent end, it stops at the n-th live window
+    found = None
+    stale = []
+    for wid, window in reversed(history.items()):
+        if window.group is not group:
+            # moved without a hook reaching us (e.g. during a config reload)
+            stale.append(wid)
+        elif n == 0:
+            found = window
+            break
+        else:
+            n -= 1
+    # the history can't change while it is being walked
+    for wid in stale:
+        _forget(wid)
+    return found
+
+
+def focus_recent(n=1):
+
+    @lazy.function
+    def _focus_recent(qtile):
+        group = qtile.current_group
+        window = recent_window(group, n)
+        if window is None:
+            return
+        group.focus(window, True)
+        if window.floating:
+            window.bring_to_front()
+
+    return _focus_recent
+
+
+@hook.subscribe.client_focus
+def _client_focus(window):
+    if window.group is not None:
+        _remember(window, window.group)
+
+
+@hook.subscribe.group_window_add
+def _group_window_add(group, window):
+    # a window moved in from elsewhere starts as the least recent
+    if _window_group.get(window.wid) != group.name:
+        _remember(window, group, recent=False)
+
+
+@hook.subscribe.client_killed
+def _client_killed(window):
+    _forget(window.wid)
@@ -0,0 +1,89 @@
+from bisect import bisect_right
+
+from libqtile import hook
+
+# group name -> {id(column): (version, (tops, entries))}, sorted by window top
+_cache = {}
+
+
+def invalidate(group=None):
+    if group is None:
+        _cache.clear()
+    else:
+        _cache.pop(group.name, None)
+
+
+def _version(column, pad):
+    # what the tops of the windows follow from: their order and heights in
+    # the column. Both change without a hook firing (e.g. grow_down).
+    heights = getattr(column, "heights", {})
+    return pad, tuple((win.wid, heights.get(win)) for win in column.clients)
+
+
+def _build_index(column, pad):
+    entries = []
+    for i, win in enumerate(column.clients):
+        top = win.get_position()[1]
+        entries.append((top - pad, top + win.get_size()[1], i, win))
+    entries.sort(key=lambda entry: entry[0])
+    return [entry[0] for entry in entries], entries
+
+
+def _contains(column, entry, y, pad):
+    _, _, i, win = entry
+    if i >= len(column.clients) or column.clients[i] is not win:
+        return False
+    top = win.get_position()[1]
+    return top - pad <= y <= top + win.get_size()[1]
+
+
+def _search(index, column, y, pad):
+    tops, entries = index
+    pos = bisect_right(tops, y) - 1
+    if pos < 0:
+        return None
+    # margins make neighbouring intervals overlap, prefer the upper window
+    if pos > 0 and entries[pos - 1][1] >= y:
+        pos -= 1
+    entry = entries[pos]
+    # only trust the cached interval if the window is still where it was
+    if not _contains(column, entry, y, pad):
+        return None
+    return entry[2], entry[3]
+
+
+def window_at(group, column, y, pad):
+    columns = _cache.setdefault(group.name, {})
+    version = _version(column, pad)
+    cached = columns.get(id(column))
+    if cached is None or cached[0] != version:
+        cached = columns[id(column)] = (version, _build_index(column, pad))
+    # a miss on an index that is up to date is a gap between the windows
+    return _search(cached[1], column, y, pad)
+
+
+@hook.subscribe.layout_change
+def _layout_change(layout, group):
+    invalidate(group)
+
+
+@hook.subscribe.group_window_add
+def _group_window_add(group, window):
+    invalidate(group)
+
+
+@hook.subscribe.client_killed
+@hook.subscribe.client_managed
+def _client_changed(window):
+    invalidate(window.group)
+
+
+@hook.subscribe.float_change
+@hook.subscribe.setgroup
+def _groups_changed():
+    invalidate()
+
+
+@hook.subscribe.screen_change
+def _screen_change(event):
+    invalidate()
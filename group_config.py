@@ -1,33 +1,9 @@
-from libqtile.config import Group, Match
+from libqtile.config import Group
 from libqtile.lazy import lazy
 from libqtile.log_utils import logger
 
-
-def get_num_monitors():
-    num_monitors = 0
-    try:
-        from Xlib import display as xdisplay
-
-        display = xdisplay.Display()
-        screen = display.screen()
-        resources = screen.root.xrandr_get_screen_resources()
-
-        for output in resources.outputs:
-            monitor = display.xrandr_get_output_info(output, resources.config_timestamp)
-            preferred = False
-            if hasattr(monitor, "preferred"):
-                preferred = monitor.preferred
-            elif hasattr(monitor, "num_preferred"):
-                preferred = monitor.num_preferred
-            if preferred:
-                num_monitors += 1
-    except ImportError:
-        logger.error("Xlib is not installed")
-    except Exception as e:
-        # always setup at least one monitor
-        logger.error(f"Exception while getting num monitors: {e}")
-    finally:
-        return max(1, num_monitors)
+from batch import batch
+from monitors import get_num_monitors, on_change
 
 
 def _go_to_group(name):
@@ -39,6 +15,19 @@ def _go_to_group(name):
     return _inner
 
 
+def _move_to_group(name):
+
+    @lazy.function
+    def _inner(qtile):
+        # relayout the old and new group once, not after each step
+        with batch():
+            if qtile.current_window:
+                qtile.current_window.togroup(name)
+            go_to_group(qtile, name)
+
+    return _inner
+
+
 def go_to_group(qtile, name):
     old = qtile.current_screen
     group = qtile.groups_map[name]
@@ -52,40 +41,41 @@ def go_to_group(qtile, name):
 
 
 def group_screen(group):
-    screen = 0
-    if group.name in "123456":
-        screen = 0
-    elif group.name in "asduio":
-        screen = 1
-    elif group.name in "zxc789":
-        screen = 2
-    else:
+    screen = _group_screen.get(group.name)
+    if screen is None:
         logger.warning(f"Group {group.name} not assigned to a screen")
-        screen = 0
-    return screen % get_num_monitors()
+        return 0
+    return screen
+
+
+def screen_groups(screen):
+    return _screen_groups.get(screen, [])
 
 
 def next_group_in_screen(group, direction):
     if direction == 1:
-        match group.name:
-            case "6":
-                return "1"
-            case "o":
-                return "a"
-            case "9":
-                return "z"
-            case _:
-                return group._get_group(direction, False, False).name
-    else:
-        match group.name:
-            case "1":
-                return "6"
-            case "a":
-                return "o"
-            case "z":
-                return "9"
-            case _:
-                return group._get_group(direction, False, False).name
+        return _next_group.get(group.name, group.name)
+    return _prev_group.get(group.name, group.name)
+
+
+def build_routing(num_monitors):
+    _group_screen.clear()
+    _screen_groups.clear()
+    _next_group.clear()
+    _prev_group.clear()
+    for group in groups_list:
+        home = home_screens.get(group.name)
+        if home is None:
+            logger.warning(f"Group {group.name} not assigned to a screen")
+            home = 0
+        screen = home % num_monitors
+        _group_screen[group.name] = screen
+        _screen_groups.setdefault(screen, []).append(group.name)
+    # each screen cycles through its own groups in groups_dict order
+    for ring in _screen_groups.values():
+        for i, name in enumerate(ring):
+            _next_group[name] = ring[(i + 1) % len(ring)]
+            _prev_group[name] = ring[i - 1]
 
 
 def switch_group(direction):
@@ -112,8 +102,7 @@ def group_key(key, name):
         # mod1 + control + key of group = move focused window and switch to group
         [
             "M-C-" + key,
-            lazy.window.togroup(name),
-            _go_to_group(name),
+            _move_to_group(name),
             f"Move and switch to group {name}",
         ],
     ]
@@ -128,7 +117,7 @@ groups_dict = {
     Group("4", matches=[]): "A-1",
     Group("5", matches=[]): "A-2",
     Group("6", matches=[]): "A-3",
-    Group("a", matches=[Match(wm_class="discord")]): "4",
+    Group("a", matches=[]): "4",  # discord, see window_rules
     Group("s", matches=[]): "5",
     Group("d", matches=[]): "6",
     Group("u", matches=[]): "A-4",
@@ -144,6 +133,18 @@ groups_dict = {
 
 groups_list = list(groups_dict.keys())
 
+# home screen of each group, wrapped to the connected monitors by build_routing
+home_screens = {}
+for names, screen in (("123456", 0), ("asduio", 1), ("zxc789", 2)):
+    home_screens.update(dict.fromkeys(names, screen))
+
+_group_screen = {}
+_screen_groups = {}
+_next_group = {}
+_prev_group = {}
+build_routing(get_num_monitors())
+on_change(build_routing)
+
 group_keys = []
 for i, k in groups_dict.items():
     group_keys.extend(group_key(k, i.name))
@@ -0,0 +1,109 @@
+import copy
+import json
+import math
+import os
+import time
+from functools import wraps
+from pathlib import Path
+
+from libqtile import hook
+from libqtile.log_utils import logger
+from libqtile.utils import get_cache_dir
+
+# QTILE_KEY_LATENCY=1 times every custom lazy.function bound to a key; dump with
+#   qtile cmd-obj -o root -f fire_user_hook -a latency_dump
+# and clear with latency_reset
+enabled = os.environ.get("QTILE_KEY_LATENCY", "") not in ("", "0")
+report_file = Path(get_cache_dir()) / "key-latency.json"
+
+# bucket i holds samples up to 2 ** (i / 4) microseconds, ~19% wide
+BUCKETS_PER_OCTAVE = 4
+NUM_BUCKETS = 26 * BUCKETS_PER_OCTAVE
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * NUM_BUCKETS
+        self.total = 0
+        self.max_us = 0.0
+
+    def add(self, seconds):
+        us = seconds * 1e6
+        index = 0
+        if us > 1:
+            index = min(math.ceil(math.log2(us) * BUCKETS_PER_OCTAVE), NUM_BUCKETS - 1)
+        self.counts[index] += 1
+        self.total += 1
+        self.max_us = max(self.max_us, us)
+
+    def percentile(self, p):
+        if not self.total:
+            return 0.0
+        wanted = math.ceil(self.total * p / 100)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= wanted:
+                return min(2 ** (index / BUCKETS_PER_OCTAVE), self.max_us)
+        return self.max_us
+
+    def summary(self):
+        return {
+            "count": self.total,
+            "p50_us": round(self.percentile(50), 1),
+            "p99_us": round(self.percentile(99), 1),
+            "max_us": round(self.max_us, 1),
+        }
+
+
+# binding -> Histogram, kept when reload_config re-executes this module
+histograms = globals().get("histograms", {})
+
+
+def timed(name, func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            histograms.setdefault(name, Histogram()).add(time.perf_counter() - start)
+
+    return wrapper
+
+
+def instrument(bind, commands, force=False):
+    if not (enabled or force):
+        return commands
+    instrumented = []
+    for command in commands:
+        if getattr(command, "name", None) == "function" and command.args:
+            func, *args = command.args
+            # copy so conditions set with .when() are kept
+            command = copy.copy(command)
+            command._args = (timed(f"{bind} {func.__qualname__}", func), *args)
+        instrumented.append(command)
+    return instrumented
+
+
+def report():
+    return {name: h.summary() for name, h in sorted(histograms.items())}
+
+
+@hook.subscribe.user("latency_dump")
+def dump():
+    result = report()
+    try:
+        report_file.write_text(json.dumps(result, indent=2))
+    except OSError as e:
+        logger.warning(f"Unable to write key latency report: {e}")
+    for name, summary in result.items():
+        logger.info(
+            f"{name}: n={summary['count']} p50={summary['p50_us']}us "
+            f"p99={summary['p99_us']}us"
+        )
+
+
+@hook.subscribe.user("latency_reset")
+def reset():
+    histograms.clear()
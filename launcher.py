@@ -0,0 +1,363 @@
+import asyncio
+import heapq
+import json
+import math
+import os
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from libqtile import pangocffi, qtile
+from libqtile.lazy import lazy
+from libqtile.log_utils import logger
+from libqtile.utils import create_task, get_cache_dir
+from libqtile.widget import prompt
+from qtile_extras.widget import modify
+
+import scheduler
+from variables import terminal
+
+index_file = Path(get_cache_dir()) / "launcher-index.json"
+launches_file = Path(get_cache_dir()) / "launcher-launches.json"
+# seconds between checks of PATH and the application directories for changes
+POLL_INTERVAL = 5
+# a launch counts half as much after this many seconds
+HALF_LIFE = 7 * 24 * 3600
+# how much frecency weighs against how well the name matches
+FRECENCY_WEIGHT = 10
+# matches shown after the input, and offered by Tab
+SHOWN = 5
+COMPLETIONS = 20
+# desktop entry field codes, a launch from here never passes files or urls
+FIELD_CODES = {f"%{c}" for c in "fFuUdDnNickvm"}
+
+# kind is "run" for PATH executables and "app" for desktop entries, key
+# identifies the entry for frecency
+Entry = namedtuple("Entry", ["name", "command", "kind", "key"])
+# lowered names plus trigram and character postings for one kind of entry
+Table = namedtuple("Table", ["entries", "names", "trigrams", "chars", "by_key"])
+
+
+def bin_dirs():
+    return list(dict.fromkeys(p for p in os.environ.get("PATH", "").split(":") if p))
+
+
+def app_dirs():
+    data_home = os.environ.get("XDG_DATA_HOME", os.path.expanduser("~/.local/share"))
+    data_dirs = os.environ.get("XDG_DATA_DIRS", "/usr/local/share:/usr/share")
+    dirs = [data_home, *data_dirs.split(":")]
+    return list(dict.fromkeys(os.path.join(d, "applications") for d in dirs if d))
+
+
+def fingerprint(path):
+    # Nix store paths all have an mtime of 1, a profile switch changes where
+    # the symlink points instead. A list, so it compares equal to itself after
+    # a round trip through the JSON index.
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [os.path.realpath(path), stat.st_ino, stat.st_mtime_ns]
+
+
+def parse_desktop(path):
+    entry = {}
+    section = None
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("["):
+                section = line
+            elif section == "[Desktop Entry]" and "=" in line:
+                key, _, value = line.partition("=")
+                entry.setdefault(key.strip(), value.strip())
+    if (
+        entry.get("Type") != "Application"
+        or entry.get("NoDisplay") == "true"
+        or entry.get("Hidden") == "true"
+        or not entry.get("Exec")
+        or not entry.get("Name")
+    ):
+        return None
+    command = " ".join(
+        arg for arg in entry["Exec"].split() if arg not in FIELD_CODES
+    ).replace("%%", "%")
+    if entry.get("Terminal") == "true":
+        command = f"{terminal} -e {command}"
+    return entry["Name"], command
+
+
+def scan(path, apps):
+    # blocking, runs in the executor
+    entries = []
+    try:
+        with os.scandir(path) as it:
+            for item in it:
+                if apps:
+                    if not item.name.endswith(".desktop"):
+                        continue
+                    try:
+                        parsed = parse_desktop(item.path)
+                    except OSError:
+                        continue
+                    if parsed is not None:
+                        entries.append((*parsed, "app", f"app:{item.name}"))
+                elif item.is_file() and os.access(item.path, os.X_OK):
+                    entries.append((item.name, item.name, "run", f"run:{item.name}"))
+    except OSError:
+        pass
+    return entries
+
+
+def build_table(dirs, kind):
+    # earlier directories win, like PATH lookup and XDG precedence
+    entries = {}
+    for path in _bin_dirs if kind == "run" else _app_dirs:
+        for entry in dirs.get(path, (None, []))[1]:
+            entry = Entry(*entry)
+            entries.setdefault(entry.key, entry)
+    entries = list(entries.values())
+    names = [entry.name.lower() for entry in entries]
+    trigrams = {}
+    chars = {}
+    for i, name in enumerate(names):
+        for j in range(len(name) - 2):
+            trigrams.setdefault(name[j : j + 3], set()).add(i)
+        for c in set(name):
+            chars.setdefault(c, set()).add(i)
+    by_key = {entry.key: i for i, entry in enumerate(entries)}
+    return Table(entries, names, trigrams, chars, by_key)
+
+
+def build_tables(dirs):
+    return {kind: build_table(dirs, kind) for kind in ("run", "app")}
+
+
+def fuzzy_score(query, name):
+    if name == query:
+        return 100
+    if name.startswith(query):
+        return 80 - len(name) * 0.1
+    pos = name.find(query)
+    if pos >= 0:
+        return 60 - pos - len(name) * 0.1
+    # every character in order, gaps cost
+    score = 40 - len(name) * 0.1
+    last = -1
+    for c in query:
+        found = name.find(c, last + 1)
+        if found < 0:
+            return None
+        score -= found - last - 1
+        last = found
+    return score
+
+
+def frecency(key, now):
+    count, last = _launches.get(key, (0, now))
+    return count * 0.5 ** ((now - last) / HALF_LIFE)
+
+
+def search(kind, query, limit=SHOWN):
+    table = _tables[kind]
+    query = query.strip().lower()
+    now = time.time()
+    if not query:
+        launched = [
+            (frecency(key, now), table.by_key[key])
+            for key in _launches
+            if key in table.by_key
+        ]
+        return [table.entries[i] for _, i in heapq.nlargest(limit, launched)]
+
+    # only names sharing every trigram (or every character) are scored
+    candidates = None
+    if len(query) >= 3:
+        for j in range(len(query) - 2):
+            posting = table.trigrams.get(query[j : j + 3], set())
+            candidates = posting if candidates is None else candidates & posting
+            if not candidates:
+                break
+    if not candidates:
+        candidates = None
+        for c in set(query):
+            posting = table.chars.get(c, set())
+            candidates = posting if candidates is None else candidates & posting
+            if not candidates:
+                return []
+
+    ranked = []
+    for i in candidates:
+        score = fuzzy_score(query, table.names[i])
+        if score is not None:
+            bonus = FRECENCY_WEIGHT * math.log1p(frecency(table.entries[i].key, now))
+            ranked.append((score + bonus, -i))
+    return [table.entries[-i] for _, i in heapq.nlargest(limit, ranked)]
+
+
+def record(entry):
+    now = time.time()
+    _launches[entry.key] = (frecency(entry.key, now) + 1, now)
+    try:
+        launches_file.parent.mkdir(parents=True, exist_ok=True)
+        launches_file.write_text(json.dumps(_launches))
+    except OSError as e:
+        logger.warning(f"Unable to save launcher history: {e}")
+
+
+def launch(kind, text):
+    text = text.strip()
+    matches = search(kind, text, 1)
+    # "run" input with arguments is a command line, not a name
+    if matches and (kind == "app" or " " not in text):
+        record(matches[0])
+        qtile.spawn(matches[0].command, shell=True)
+    elif text:
+        qtile.spawn(text, shell=True)
+
+
+def load():
+    try:
+        data = json.loads(index_file.read_text())
+        dirs = {path: (m, entries) for path, (m, entries) in data.items()}
+    except FileNotFoundError:
+        dirs = {}
+    except (OSError, ValueError, TypeError):
+        logger.exception("Unable to read the launcher index")
+        dirs = {}
+    try:
+        data = json.loads(launches_file.read_text())
+        launches = {key: tuple(value) for key, value in data.items()}
+    except FileNotFoundError:
+        launches = {}
+    except (OSError, ValueError, TypeError, AttributeError):
+        logger.exception("Unable to read the launcher history")
+        launches = {}
+    return dirs, launches
+
+
+def save(dirs):
+    # blocking, runs in the executor
+    try:
+        index_file.parent.mkdir(parents=True, exist_ok=True)
+        index_file.write_text(json.dumps(dirs, separators=(",", ":")))
+    except OSError as e:
+        logger.warning(f"Unable to save the launcher index: {e}")
+
+
+async def _rescan(changed):
+    global _dirs, _tables, _task
+    loop = asyncio.get_running_loop()
+    try:
+        apps = set(_app_dirs)
+        scanned = await loop.run_in_executor(
+            None, lambda: {path: scan(path, path in apps) for path in changed}
+        )
+        dirs = {path: _dirs[path] for path in (*_bin_dirs, *_app_dirs) if path in _dirs}
+        for path, entries in scanned.items():
+            dirs[path] = (changed[path], entries)
+        _tables = await loop.run_in_executor(None, build_tables, dirs)
+        _dirs = dirs
+        await loop.run_in_executor(None, save, dirs)
+    except Exception:
+        logger.exception("Unable to update the launcher index")
+    finally:
+        _task = None
+
+
+def _check():
+    # a directory's mtime changes when anything is added, removed or renamed
+    # in it, so only those whose fingerprint changed are scanned again
+    global _task, _bin_dirs, _app_dirs
+    if _task is not None:
+        return
+    _bin_dirs, _app_dirs = bin_dirs(), app_dirs()
+    changed = {}
+    for path in (*_bin_dirs, *_app_dirs):
+        current = fingerprint(path)
+        if path not in _dirs or _dirs[path][0] != current:
+            changed[path] = current
+    stale = set(_dirs) - {*_bin_dirs, *_app_dirs}
+    if changed or stale:
+        _task = create_task(_rescan(changed))
+
+
+# the index lives in memory, reload_config keeps it and a restart reads it
+# back from the cache; opening the launcher never touches the disk
+_bin_dirs, _app_dirs = bin_dirs(), app_dirs()
+if "_tables" not in globals():
+    _dirs, _launches = load()
+    _tables = build_tables(_dirs)
+_task = None
+
+
+class Completer:
+    # Tab cycles through the best matches, then back to the input
+    def __init__(self, qtile):
+        self.kind = "run"
+        self.reset()
+
+    def actual(self):
+        return self.thisfinal
+
+    def reset(self):
+        self.matches = None
+        self.offset = -1
+        self.thisfinal = None
+
+    def complete(self, txt, aliases=None):
+        if self.matches is None:
+            self.matches = [e.name for e in search(self.kind, txt, COMPLETIONS)]
+            self.matches.append(txt)
+        self.offset = (self.offset + 1) % len(self.matches)
+        self.thisfinal = self.matches[self.offset]
+        return self.thisfinal
+
+
+class Launcher(prompt.Prompt):
+    completers = {**prompt.Prompt.completers, "launcher": Completer}
+
+    def __init__(self, **config):
+        prompt.Prompt.__init__(self, **config)
+        self.kind = "run"
+        self.shown = (None, None, "")
+
+    def open(self, kind):
+        self.kind = kind
+        name = "run" if kind == "run" else "drun"
+        self.start_input(name, lambda text: launch(kind, text), "launcher")
+        self.completer.kind = kind
+
+    def _update(self):
+        prompt.Prompt._update(self)
+        if not self.active:
+            return
+        # the cursor blink updates too, only search when the input changed
+        if self.shown[:2] != (self.kind, self.user_input):
+            names = [e.name for e in search(self.kind, self.user_input)]
+            text = "  ".join(pangocffi.markup_escape_text(name) for name in names)
+            self.shown = (self.kind, self.user_input, text)
+        if self.shown[2]:
+            self.text += f'  <span fgalpha="60%">{self.shown[2]}</span>'
+
+
+Launcher = modify(Launcher, initialise=False)
+
+
+def open_launcher(kind):
+    @lazy.function
+    def _open(qtile):
+        bar = qtile.current_screen.top
+        for w in getattr(bar, "widgets", []):
+            if isinstance(w, Launcher):
+                w.open(kind)
+                return
+        # no bar on this screen
+        qtile.spawn(f"rofi -show {'run' if kind == 'run' else 'drun'} -i", shell=True)
+
+    return _open
+
+
+# registered on every (re-)execution, startup_complete only fires once; a new
+# job is due right away, so this also does the first check
+scheduler.register(_check, POLL_INTERVAL, name="launcher")
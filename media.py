@@ -0,0 +1,135 @@
+import asyncio
+
+from dbus_fast import Message, MessageType
+from dbus_fast.aio import MessageBus
+from libqtile import qtile
+from libqtile.lazy import lazy
+from libqtile.log_utils import logger
+from libqtile.utils import create_task
+from libqtile.widget.pulse_volume import pulse
+
+from variables import max_volume
+
+# key repeats landing within one frame are merged into a single volume change
+FRAME = 1 / 60
+
+MPRIS_SERVICE = "org.mpris.MediaPlayer2.playerctld"
+MPRIS_PATH = "/org/mpris/MediaPlayer2"
+MPRIS_PLAYER = "org.mpris.MediaPlayer2.Player"
+
+_pending_delta = 0
+_flushing = False
+# reload_config re-executes this module in place, keep the open bus around
+_bus = globals().get("_bus")
+_bus_lock = asyncio.Lock()
+
+
+def _pulse_ready():
+    return (
+        pulse.pulse is not None
+        and pulse.pulse.connected
+        and pulse.default_sink is not None
+    )
+
+
+def _wpctl_volume(step):
+    sign = "+" if step > 0 else "-"
+    qtile.spawn(
+        f"wpctl set-volume -l {max_volume} @DEFAULT_AUDIO_SINK@ {abs(step)}%{sign}"
+    )
+
+
+def change_volume(step):
+    global _pending_delta, _flushing
+    if not _pulse_ready():
+        _wpctl_volume(step)
+        return
+    _pending_delta += step
+    if not _flushing:
+        _flushing = True
+        qtile.call_later(FRAME, create_task, _flush_volume())
+
+
+async def _flush_volume():
+    global _pending_delta, _flushing
+    try:
+        # the sink can go away between the keypress and this flush
+        if not _pulse_ready():
+            delta, _pending_delta = _pending_delta, 0
+            if delta:
+                _wpctl_volume(delta)
+            return
+        sink = pulse.default_sink
+        # the sink object only updates when pulse reports back, so track the
+        # value we set while repeats keep arriving
+        volume = sink.volume.value_flat
+        while _pending_delta:
+            delta, _pending_delta = _pending_delta, 0
+            volume = min(max(volume + delta / 100, 0), max_volume)
+            await pulse.pulse.volume_set_all_chans(sink, volume)
+    except Exception:
+        logger.exception("Failed to set volume")
+        _pending_delta = 0
+    finally:
+        _flushing = False
+
+
+def toggle_mute():
+    if not _pulse_ready():
+        qtile.spawn("wpctl set-mute @DEFAULT_AUDIO_SINK@ toggle")
+        return
+    sink = pulse.default_sink
+    create_task(pulse.pulse.sink_mute(sink.index, not sink.mute))
+
+
+async def _get_bus():
+    global _bus
+    async with _bus_lock:
+        if _bus is None or not _bus.connected:
+            _bus = await MessageBus().connect()
+    return _bus
+
+
+async def _player(method):
+    try:
+        bus = await _get_bus()
+        reply = await bus.call(
+            Message(
+                destination=MPRIS_SERVICE,
+                path=MPRIS_PATH,
+                interface=MPRIS_PLAYER,
+                member=method,
+            )
+        )
+    except Exception as e:
+        logger.warning(f"Unable to reach MPRIS player: {e}")
+        return
+    if reply.message_type == MessageType.ERROR:
+        logger.warning(f"MPRIS {method} failed: {reply.error_name}")
+
+
+def player_command(method):
+    create_task(_player(method))
+
+
+def volume(step):
+
+    @lazy.function
+    def _volume(qtile):
+        change_volume(step)
+
+    return _volume
+
+
+def player(method):
+
+    @lazy.function
+    def _player_command(qtile):
+        player_command(method)
+
+    return _player_command
+
+
+@lazy.function
+def mute(qtile):
+    toggle_mute()
@@ -0,0 +1,359 @@
+import glob
+import os
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from libqtile.log_utils import logger
+from libqtile.utils import send_notification
+from libqtile.widget import base
+from qtile_extras.widget import modify
+
+import scheduler
+
+Snapshot = namedtuple(
+    "Snapshot", ["time", "cpu", "memory", "net_down", "net_up", "battery"]
+)
+
+
+class Source:
+    # keeps the file open and re-reads it from the start on every tick
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+
+    def read(self):
+        try:
+            if self.fd is None:
+                self.fd = os.open(self.path, os.O_RDONLY)
+            return os.pread(self.fd, 65536, 0).decode("utf-8", "replace")
+        except OSError as e:
+            logger.warning(f"Unable to read {self.path}: {e}")
+            self.close()
+            return ""
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def parse_stat(text):
+    # user nice system idle iowait irq softirq steal, guest time is already in user
+    fields = [int(v) for v in text.split("\n", 1)[0].split()[1:9]]
+    return sum(fields), fields[3] + fields[4]
+
+
+def parse_meminfo(text):
+    info = {}
+    for line in text.splitlines():
+        key, _, value = line.partition(":")
+        info[key] = int(value.split()[0]) * 1024
+    return info
+
+
+def parse_net_dev(text):
+    down = up = 0
+    for line in text.splitlines()[2:]:
+        _, _, counters = line.partition(":")
+        counters = counters.split()
+        down += int(counters[0])
+        up += int(counters[8])
+    return down, up
+
+
+def battery_levels(battery):
+    # sysfs reports energy in µWh/µW or charge in µAh/µA
+    now = int(battery.get("ENERGY_NOW", battery.get("CHARGE_NOW", 0)))
+    full = int(battery.get("ENERGY_FULL", battery.get("CHARGE_FULL", 0)))
+    power = int(battery.get("POWER_NOW", battery.get("CURRENT_NOW", 0)))
+    if full:
+        percent = min(now / full, 1)
+    else:
+        percent = int(battery.get("CAPACITY", 0)) / 100
+    return now, full, power, percent
+
+
+def parse_uevent(text):
+    info = {}
+    for line in text.splitlines():
+        key, _, value = line.partition("=")
+        info[key.removeprefix("POWER_SUPPLY_")] = value
+    return info
+
+
+class Sampler:
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.callbacks = []
+        self.snapshot = None
+        self.job = None
+        self.stat = Source("/proc/stat")
+        self.meminfo = Source("/proc/meminfo")
+        self.net_dev = Source("/proc/net/dev")
+        batteries = sorted(glob.glob("/sys/class/power_supply/BAT*/uevent"))
+        self.battery = Source(batteries[0]) if batteries else None
+        self._cpu = None
+        self._net = None
+        # set by the Battery widgets, checked once per sample however many
+        # bars show one
+        self.notify_below = None
+        self.notified = False
+
+    def adopt(self, previous):
+        # carry open files and rate history over a config reload
+        self.stat = previous.stat
+        self.meminfo = previous.meminfo
+        self.net_dev = previous.net_dev
+        self.battery = previous.battery
+        self._cpu = previous._cpu
+        self._net = previous._net
+        self.snapshot = previous.snapshot
+        self.notified = previous.notified
+        # the scheduler keeps its jobs over a reload, the new widgets
+        # subscribe to this sampler and start its own
+        if previous.job is not None:
+            scheduler.unregister(previous.job)
+            previous.job = None
+
+    def subscribe(self, callback):
+        self.callbacks.append(callback)
+        if self.job is None:
+            self.job = scheduler.register(self.tick, self.interval)
+
+    def unsubscribe(self, callback):
+        try:
+            self.callbacks.remove(callback)
+        except ValueError:
+            pass
+        if not self.callbacks and self.job is not None:
+            scheduler.unregister(self.job)
+            self.job = None
+
+    def sample(self):
+        # a source that can't be read keeps its value from the last sample,
+        # the next good read measures the rates over the whole gap
+        now = time.monotonic()
+        previous = self.snapshot
+
+        cpu = previous.cpu if previous else 0.0
+        text = self.stat.read()
+        if text:
+            total, idle = parse_stat(text)
+            if self._cpu is not None:
+                delta = total - self._cpu[0]
+                if delta > 0:
+                    cpu = round(100 * (1 - (idle - self._cpu[1]) / delta), 1)
+            self._cpu = (total, idle)
+
+        net_down = net_up = 0.0
+        if previous:
+            net_down, net_up = previous.net_down, previous.net_up
+        text = self.net_dev.read()
+        if text:
+            down, up = parse_net_dev(text)
+            if self._net is not None:
+                elapsed = now - self._net[0]
+                if elapsed > 0:
+                    net_down = max(down - self._net[1], 0) / elapsed
+                    net_up = max(up - self._net[2], 0) / elapsed
+            self._net = (now, down, up)
+
+        memory = previous.memory if previous else MappingProxyType({})
+        text = self.meminfo.read()
+        if text:
+            memory = MappingProxyType(parse_meminfo(text))
+
+        battery = None
+        if self.battery is not None:
+            battery = previous and previous.battery
+            text = self.battery.read()
+            if text:
+                battery = MappingProxyType(parse_uevent(text))
+
+        return Snapshot(now, cpu, memory, net_down, net_up, battery)
+
+    def check_notify(self, battery):
+        if self.notify_below is None or battery is None:
+            return
+        percent = battery_levels(battery)[3]
+        low = percent * 100 < self.notify_below
+        if battery.get("STATUS") == "Discharging" and low:
+            if not self.notified:
+                send_notification(
+                    "Warning", f"Battery at {percent:.0%}", urgent=True
+                )
+                self.notified = True
+        else:
+            self.notified = False
+
+    def tick(self):
+        self.snapshot = self.sample()
+        battery = self.snapshot.battery
+        scheduler.set_on_battery(
+            battery is not None and battery.get("STATUS") == "Discharging"
+        )
+        self.check_notify(battery)
+        for callback in self.callbacks:
+            callback(self.snapshot)
+
+
+_previous = globals().get("sampler")
+sampler = Sampler()
+if _previous is not None:
+    sampler.adopt(_previous)
+
+
+class _SampledText(base._TextBox):
+    defaults = [("format", "{}", "Display format")]
+
+    def __init__(self, **config):
+        base._TextBox.__init__(self, "", **config)
+        self.add_defaults(_SampledText.defaults)
+
+    def _configure(self, qtile, bar):
+        # start from the last sample so a reload doesn't blank the widget
+        if sampler.snapshot is not None:
+            try:
+                self.text = self.render(sampler.snapshot)
+            except Exception:
+                logger.exception(f"{self.name} failed to render")
+        base._TextBox._configure(self, qtile, bar)
+        sampler.subscribe(self.sampled)
+        scheduler.on_visible(self.revealed)
+
+    def revealed(self, screen):
+        if sampler.snapshot is not None and screen in (None, self.bar.screen.index):
+            self.sampled(sampler.snapshot)
+
+    def sampled(self, snapshot):
+        # nobody can see a bar under a fullscreen window, catch up when revealed
+        if scheduler.is_obscured(self.bar.screen.index):
+            return
+        try:
+            self.update(self.render(snapshot))
+        except Exception:
+            logger.exception(f"{self.name} failed to render")
+
+    def render(self, snapshot):
+        raise NotImplementedError
+
+    def finalize(self):
+        sampler.unsubscribe(self.sampled)
+        scheduler.remove_on_visible(self.revealed)
+        base._TextBox.finalize(self)
+
+
+class CPU(_SampledText):
+    def render(self, snapshot):
+        return self.format.format(load_percent=snapshot.cpu)
+
+
+class Memory(_SampledText):
+    defaults = [("measure_mem", "M", "Unit for memory values: K, M, G or T")]
+
+    def __init__(self, **config):
+        _SampledText.__init__(self, **config)
+        self.add_defaults(Memory.defaults)
+        self.divisor = 1024 ** ("BKMGT".index(self.measure_mem))
+
+    def render(self, snapshot):
+        mem = snapshot.memory
+        values = {
+            "MemTotal": mem["MemTotal"],
+            "MemFree": mem["MemFree"],
+            "Available": mem["MemAvailable"],
+            "MemUsed": mem["MemTotal"] - mem["MemAvailable"],
+            "Buffers": mem["Buffers"],
+            "Cached": mem["Cached"],
+            "SwapTotal": mem["SwapTotal"],
+            "SwapFree": mem["SwapFree"],
+            "SwapUsed": mem["SwapTotal"] - mem["SwapFree"],
+        }
+        values = {k: v / self.divisor for k, v in values.items()}
+        values["mm"] = self.measure_mem
+        values["NotAvailable"] = values["MemTotal"] - values["Available"]
+        return self.format.format(**values)
+
+
+class Net(_SampledText):
+    defaults = [("prefix", None, "Fixed unit prefix for rates, e.g. k or M")]
+
+    def __init__(self, **config):
+        _SampledText.__init__(self, **config)
+        self.add_defaults(Net.defaults)
+
+    def convert(self, rate):
+        units = ["", "k", "M", "G", "T"]
+        if self.prefix is None:
+            power = 0
+            while rate >= 1000 and power < len(units) - 1:
+                rate /= 1000
+                power += 1
+        else:
+            power = units.index(self.prefix)
+            rate /= 1000**power
+        return rate, units[power] + "B"
+
+    def render(self, snapshot):
+        down, down_suffix = self.convert(snapshot.net_down)
+        up, up_suffix = self.convert(snapshot.net_up)
+        return self.format.format(
+            down=down, down_suffix=down_suffix, up=up, up_suffix=up_suffix
+        )
+
+
+class Battery(_SampledText):
+    defaults = [
+        ("charge_char", "^", "Character for charging"),
+        ("discharge_char", "V", "Character for discharging"),
+        ("full_char", "=", "Character for a full battery"),
+        ("empty_char", "x", "Character for an empty battery"),
+        ("unknown_char", "?", "Character for an unknown state"),
+        ("notify_below", None, "Notify below this percentage"),
+    ]
+
+    def __init__(self, **config):
+        _SampledText.__init__(self, **config)
+        self.add_defaults(Battery.defaults)
+
+    def _configure(self, qtile, bar):
+        if self.notify_below is not None:
+            sampler.notify_below = self.notify_below
+        _SampledText._configure(self, qtile, bar)
+
+    def render(self, snapshot):
+        battery = snapshot.battery
+        if battery is None:
+            return "No battery"
+        status = battery.get("STATUS", "Unknown")
+        now, full, power, percent = battery_levels(battery)
+
+        hours = 0.0
+        if power and status == "Discharging":
+            hours = now / power
+        elif power and status == "Charging":
+            hours = (full - now) / power
+
+        char = {
+            "Charging": self.charge_char,
+            "Discharging": self.discharge_char,
+            "Full": self.full_char,
+            "Not charging": self.full_char,
+        }.get(status, self.unknown_char)
+        if percent <= 0.01:
+            char = self.empty_char
+
+        return self.format.format(
+            percent=percent,
+            char=char,
+            hour=int(hours),
+            min=int(hours * 60) % 60,
+            watt=power / 1e6,
+        )
+
+
+CPU = modify(CPU, initialise=False)
+Memory = modify(Memory, initialise=False)
+Net = modify(Net, initialise=False)
+Battery = modify(Battery, initialise=False)
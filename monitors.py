@@ -0,0 +1,79 @@
+from libqtile import hook, qtile
+from libqtile.log_utils import logger
+
+from profiling import profiled
+
+# number of connected monitors, probed once and refreshed on randr events;
+# kept when reload_config re-executes this module, the hooks keep it current
+_num_monitors = globals().get("_num_monitors")
+_listeners = []
+
+
+@profiled
+def probe_monitors():
+    num_monitors = 0
+    try:
+        from Xlib import display as xdisplay
+
+        display = xdisplay.Display()
+        try:
+            screen = display.screen()
+            resources = screen.root.xrandr_get_screen_resources()
+
+            for output in resources.outputs:
+                monitor = display.xrandr_get_output_info(
+                    output, resources.config_timestamp
+                )
+                preferred = False
+                if hasattr(monitor, "preferred"):
+                    preferred = monitor.preferred
+                elif hasattr(monitor, "num_preferred"):
+                    preferred = monitor.num_preferred
+                if preferred:
+                    num_monitors += 1
+        finally:
+            display.close()
+    except ImportError:
+        logger.error("Xlib is not installed")
+    except Exception as e:
+        # always setup at least one monitor
+        logger.error(f"Exception while getting num monitors: {e}")
+    return max(1, num_monitors)
+
+
+def get_num_monitors():
+    global _num_monitors
+    if _num_monitors is None:
+        _num_monitors = probe_monitors()
+    return _num_monitors
+
+
+def set_num_monitors(num_monitors):
+    global _num_monitors
+    num_monitors = max(1, num_monitors)
+    if num_monitors == _num_monitors:
+        return
+    old = _num_monitors
+    _num_monitors = num_monitors
+    if old is not None:
+        logger.info(f"Monitor count changed from {old} to {num_monitors}")
+    for callback in _listeners:
+        callback(num_monitors)
+
+
+def on_change(callback):
+    _listeners.append(callback)
+    return callback
+
+
+@hook.subscribe.screen_change
+def _screen_change(event):
+    # reconfigure_screens is off, so qtile.screens is stale here; ask randr
+    set_num_monitors(probe_monitors())
+
+
+@hook.subscribe.startup_complete
+@hook.subscribe.screens_reconfigured
+def _sync_with_qtile():
+    if qtile is not None and qtile.screens:
+        set_num_monitors(len(qtile.screens))
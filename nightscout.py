@@ -0,0 +1,215 @@
+import asyncio
+import http.client
+import json
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+from libqtile.log_utils import logger
+from libqtile.utils import create_task
+from libqtile.widget import base
+from qtile_extras.widget import modify
+
+import scheduler
+
+# seconds to wait for the server before giving up on a fetch
+TIMEOUT = 10
+
+ARROWS = {
+    "Flat": "󰁕",
+    "FortyFiveUp": "󰧆",
+    "SingleUp": "󰁞",
+    "FortyFiveDown": "󰦺",
+    "SingleDown": "󰁆",
+    "DoubleUp": "󰁞󰁞",
+    "DoubleDown": "󰁆󰁆",
+}
+
+# last good response per URL plus the validators for conditional requests;
+# kept when reload_config re-executes this module
+Entry = namedtuple("Entry", ["etag", "last_modified", "data", "fetched", "error"])
+EMPTY = Entry(None, None, None, None, None)
+_cache = globals().get("_cache", {})
+
+# one fetcher per URL, shared by the widgets on every screen
+for _fetcher in globals().get("_fetchers", {}).values():
+    _fetcher.close()
+_fetchers = {}
+
+
+def parse_nightscout(data):
+    if not data:
+        return "-- No data"
+    entry = data[0]
+    dtime = datetime.now() - datetime.fromtimestamp(entry["date"] / 1000)
+    if dtime > timedelta(minutes=15):
+        return "-- No data"
+    arrow = ARROWS.get(entry.get("direction"), "?")
+    delta = entry.get("delta")
+    if delta is None:
+        delta_s = ""
+    elif delta >= 0:
+        delta_s = f"+{delta:.0f}mg/dL "
+    else:
+        delta_s = f"{delta:.0f}mg/dL "
+    return f"{arrow} {entry['sgv']} {delta_s}"
+
+
+class Fetcher:
+    def __init__(self, url, interval, headers=None):
+        self.url = url
+        parts = urlsplit(url)
+        self.connection_class = (
+            http.client.HTTPSConnection
+            if parts.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self.netloc = parts.netloc
+        self.path = parts.path or "/"
+        if parts.query:
+            self.path += "?" + parts.query
+        self.headers = {"Accept": "application/json", **(headers or {})}
+        self.interval = interval
+        self.callbacks = []
+        self.job = None
+        self.task = None
+        self.conn = None
+
+    def subscribe(self, callback):
+        self.callbacks.append(callback)
+        entry = _cache.get(self.url)
+        if entry is not None:
+            callback(entry)
+        if self.job is None:
+            self.job = scheduler.register(self.tick, self.interval)
+
+    def unsubscribe(self, callback):
+        try:
+            self.callbacks.remove(callback)
+        except ValueError:
+            pass
+        if not self.callbacks and self.job is not None:
+            scheduler.unregister(self.job)
+            self.job = None
+
+    def tick(self):
+        # skip a tick rather than pile up requests to a slow server
+        if self.task is None or self.task.done():
+            self.task = create_task(self.fetch())
+
+    def close(self):
+        # the scheduler keeps its jobs over a reload
+        if self.job is not None:
+            scheduler.unregister(self.job)
+            self.job = None
+        self._drop_connection()
+
+    def _drop_connection(self):
+        # the request side only touches the connection, close() also changes
+        # the scheduler and belongs to the event loop thread
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def request(self, entry):
+        # blocking, runs in the executor; only one at a time per fetcher
+        headers = dict(self.headers)
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        for retry in (False, True):
+            if self.conn is None:
+                self.conn = self.connection_class(self.netloc, timeout=TIMEOUT)
+            try:
+                self.conn.request("GET", self.path, headers=headers)
+                response = self.conn.getresponse()
+                body = response.read()
+            except (ConnectionResetError, BrokenPipeError):
+                # the server dropped the kept-alive connection, reconnect once
+                self._drop_connection()
+                if retry:
+                    raise
+                continue
+            except Exception:
+                self._drop_connection()
+                raise
+            if response.will_close:
+                self._drop_connection()
+            return (
+                response.status,
+                response.getheader("ETag"),
+                response.getheader("Last-Modified"),
+                body,
+            )
+
+    async def fetch(self):
+        entry = _cache.get(self.url, EMPTY)
+        loop = asyncio.get_running_loop()
+        try:
+            status, etag, last_modified, body = await loop.run_in_executor(
+                None, self.request, entry
+            )
+            if status == 304:
+                entry = entry._replace(fetched=time.time(), error=None)
+            elif status == 200:
+                entry = Entry(etag, last_modified, json.loads(body), time.time(), None)
+            else:
+                entry = entry._replace(error=f"HTTP {status}")
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            entry = entry._replace(error=str(e) or type(e).__name__)
+        if entry.error:
+            logger.warning(f"Unable to fetch {self.url}: {entry.error}")
+        _cache[self.url] = entry
+        for callback in list(self.callbacks):
+            callback(entry)
+
+
+def fetcher(url, interval, headers=None):
+    if url not in _fetchers:
+        _fetchers[url] = Fetcher(url, interval, headers)
+    return _fetchers[url]
+
+
+class Nightscout(base._TextBox):
+    defaults = [
+        ("url", None, "Nightscout entries URL, e.g. .../api/v1/entries/sgv?count=1"),
+        ("headers", {}, "Extra request headers"),
+        ("update_interval", 150, "Seconds between fetches"),
+        ("stale_after", 600, "Show the age of the last value once it is this old"),
+    ]
+
+    def __init__(self, **config):
+        base._TextBox.__init__(self, "--", **config)
+        self.add_defaults(Nightscout.defaults)
+        self.fetcher = None
+
+    def _configure(self, qtile, bar):
+        base._TextBox._configure(self, qtile, bar)
+        self.fetcher = fetcher(self.url, self.update_interval, self.headers)
+        self.fetcher.subscribe(self.fetched)
+
+    def fetched(self, entry):
+        self.update(self.render(entry))
+
+    def render(self, entry):
+        if entry.data is None:
+            return "-- No data" if entry.error else "--"
+        try:
+            text = parse_nightscout(entry.data)
+        except (KeyError, TypeError, ValueError, IndexError) as e:
+            logger.warning(f"Unexpected Nightscout data: {e}")
+            return "-- Bad data"
+        age = time.time() - entry.fetched
+        if age > self.stale_after:
+            text += f"({age // 60:.0f}m old) "
+        return text
+
+    def finalize(self):
+        if self.fetcher is not None:
+            self.fetcher.unsubscribe(self.fetched)
+        base._TextBox.finalize(self)
+
+
+Nightscout = modify(Nightscout, initialise=False)
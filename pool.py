@@ -0,0 +1,146 @@
+import os
+
+from libqtile import hook, qtile
+from libqtile.config import ScratchPad
+from libqtile.lazy import lazy
+from libqtile.log_utils import logger
+
+from variables import terminal, terminal_pools
+
+GROUP = "pool"
+# pooled windows are started with `terminal --name <PREFIX><pool>`, which sets
+# the instance half of WM_CLASS and leaves the class (kitty) alone
+PREFIX = "qtile-pool-"
+# seconds to wait after a handout before starting the replacement, so it
+# doesn't compete with the window that is being shown
+REFILL_DELAY = 1.0
+# a pool whose windows keep dying before they are used stops refilling
+MAX_FAILURES = 3
+
+# never on a screen, so its windows are managed but stay unmapped
+group = ScratchPad(GROUP, [])
+
+# pool -> wids of the idle windows, oldest first. Kept over a reload, the
+# windows are still there.
+_idle = globals().get("_idle", {})
+# pool -> pids of started processes whose window hasn't been mapped yet
+_starting = globals().get("_starting", {})
+_failures = globals().get("_failures", {})
+if globals().get("_timer") is not None:
+    _timer.cancel()
+_timer = None
+
+
+def command(name, pooled=False):
+    args, _ = terminal_pools[name]
+    if pooled:
+        return [terminal, "--name", PREFIX + name, *args]
+    return [terminal, *args]
+
+
+def pool_name(window):
+    wm_class = window.get_wm_class() or ()
+    if not wm_class or not wm_class[0].startswith(PREFIX):
+        return None
+    name = wm_class[0].removeprefix(PREFIX)
+    return name if name in terminal_pools else None
+
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def adopt(window):
+    # called for every new window, True if the pool took it
+    name = pool_name(window)
+    if name is None:
+        return False
+    idle = _idle.setdefault(name, [])
+    if window.group is None:
+        # only windows of processes the pool started. A handed out kitty
+        # keeps its --name, the windows it opens later are the user's.
+        starting = _starting.get(name, set())
+        if window.get_pid() not in starting:
+            return False
+        starting.discard(window.get_pid())
+    elif window.group.name != GROUP or len(idle) >= terminal_pools[name][1]:
+        # re-managed after a restart: a terminal that was handed out, or one
+        # the pool no longer wants
+        return False
+    if window.wid not in idle:
+        idle.append(window.wid)
+    if window.group is None:
+        qtile.groups_map[GROUP].add(window, focus=False)
+    return True
+
+
+def fill():
+    global _timer
+    _timer = None
+    for name, (_, size) in terminal_pools.items():
+        if _failures.get(name, 0) >= MAX_FAILURES:
+            continue
+        # forget processes that exited before mapping a window
+        starting = {pid for pid in _starting.get(name, set()) if alive(pid)}
+        _starting[name] = starting
+        for _ in range(size - len(_idle.get(name, [])) - len(starting)):
+            pid = qtile.spawn(command(name, pooled=True))
+            if pid > 0:
+                starting.add(pid)
+
+
+def _schedule_fill():
+    global _timer
+    if _timer is None:
+        _timer = qtile.call_later(REFILL_DELAY, fill)
+
+
+def hand_out(name):
+    # show an idle window of the pool on the current group, or start one
+    # the slow way if the pool is empty
+    idle = _idle.get(name, [])
+    while idle:
+        window = qtile.windows_map.get(idle.pop(0))
+        if window is not None and window.group is qtile.groups_map[GROUP]:
+            window.togroup(qtile.current_group.name)
+            _failures.pop(name, None)
+            break
+    else:
+        qtile.spawn(command(name))
+    _schedule_fill()
+
+
+def take(name):
+    @lazy.function
+    def _take(qtile):
+        hand_out(name)
+
+    return _take
+
+
+@hook.subscribe.client_killed
+def _client_killed(window):
+    for name, idle in _idle.items():
+        if window.wid in idle:
+            idle.remove(window.wid)
+            # died without ever being used, e.g. the command doesn't exist
+            _failures[name] = _failures.get(name, 0) + 1
+            if _failures[name] == MAX_FAILURES:
+                logger.warning(f"Pooled {name} windows keep exiting, not refilling")
+            _schedule_fill()
+
+
+@hook.subscribe.startup_complete
+def _startup_complete():
+    # after a restart the idle windows are back in the group, but not in _idle
+    for window in qtile.groups_map[GROUP].windows:
+        name = pool_name(window)
+        if name is not None and window.wid not in _idle.setdefault(name, []):
+            _idle[name].append(window.wid)
+    _schedule_fill()
@@ -0,0 +1,140 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+
+from libqtile.log_utils import logger
+from libqtile.utils import get_cache_dir
+
+# QTILE_PROFILE_STARTUP=1 records how long loading the config takes, and
+# QTILE_STARTUP_BUDGET_MS=<ms> warns when a (re)load goes over that budget
+enabled = os.environ.get("QTILE_PROFILE_STARTUP", "") not in ("", "0")
+budget_ms = float(os.environ.get("QTILE_STARTUP_BUDGET_MS", 0)) or None
+report_file = Path(get_cache_dir()) / "startup-profile.json"
+config_dir = Path(__file__).resolve().parent
+
+# reload_config re-executes this module inside the timer of its own import,
+# keep what that timer appends to
+_records = globals().get("_records", [])
+_depth = globals().get("_depth", 0)
+_load_start = globals().get("_load_start", 0.0)
+
+
+def _record(name, start):
+    _records.append(
+        {
+            "name": name,
+            "start": start,
+            "ms": round((time.perf_counter() - start) * 1000, 3),
+            "depth": _depth,
+        }
+    )
+
+
+@contextmanager
+def timed(name):
+    global _depth
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    _depth += 1
+    try:
+        yield
+    finally:
+        _depth -= 1
+        _record(name, start)
+
+
+def profiled(func):
+    if not enabled:
+        return func
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        call = ", ".join(repr(arg) for arg in args)
+        with timed(f"{func.__name__}({call})"):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+class _TimedLoader:
+    def __init__(self, loader):
+        self.loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def exec_module(self, module):
+        with timed(f"import {module.__name__}"):
+            self.loader.exec_module(module)
+
+
+class _ImportTimer:
+    # times the execution of modules that live next to config.py, which
+    # covers both the first import and importlib.reload on reload_config
+    qtile_profiler = True
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if getattr(finder, "qtile_profiler", False):
+                continue
+            find_spec = getattr(finder, "find_spec", None)
+            spec = find_spec and find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        origin = spec.origin and Path(spec.origin).resolve()
+        if origin and origin.parent == config_dir and spec.loader is not None:
+            spec.loader = _TimedLoader(spec.loader)
+        return spec
+
+
+def install():
+    # runs first on every (re)load. Anything that started earlier belongs to
+    # a previous load, e.g. a LazyBar building its widgets after report().
+    global _load_start
+    _load_start = time.perf_counter()
+    _records.clear()
+    sys.meta_path[:] = [
+        f for f in sys.meta_path if not getattr(f, "qtile_profiler", False)
+    ]
+    if enabled:
+        sys.meta_path.insert(0, _ImportTimer())
+
+
+def report():
+    records = [record for record in _records if record["start"] >= _load_start]
+    _records.clear()
+    if not enabled or not records:
+        return
+    first = min(record["start"] for record in records)
+    total_ms = round((time.perf_counter() - first) * 1000, 3)
+    entries = sorted(records, key=lambda record: record["start"])
+    result = {
+        "total_ms": total_ms,
+        "budget_ms": budget_ms,
+        "over_budget": budget_ms is not None and total_ms > budget_ms,
+        "entries": [
+            {k: v for k, v in entry.items() if k != "start"} for entry in entries
+        ],
+    }
+    try:
+        report_file.write_text(json.dumps(result, indent=2))
+    except OSError as e:
+        logger.warning(f"Unable to write startup profile: {e}")
+    slowest = sorted(entries, key=lambda record: record["ms"], reverse=True)[:5]
+    logger.info(
+        f"Config loaded in {total_ms}ms, slowest: "
+        + ", ".join(f"{r['name']} {r['ms']}ms" for r in slowest)
+    )
+    if result["over_budget"]:
+        logger.warning(f"Config load took {total_ms}ms, budget is {budget_ms}ms")
+
+
+install()
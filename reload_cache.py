@@ -0,0 +1,36 @@
+import os
+
+# reload_config re-executes every config module (twice), so anything built
+# from slow inputs is kept here and reused while its fingerprint matches
+_cache = globals().get("_cache", {})
+
+
+def file_fingerprint(path):
+    # a file in the Nix store always has an mtime of 1, a new version is a
+    # different file the symlink points to
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return (os.fspath(path), None)
+    return (
+        os.path.realpath(path),
+        stat.st_ino,
+        stat.st_mtime_ns,
+        stat.st_size,
+    )
+
+
+def cached(name, fingerprint, build):
+    entry = _cache.get(name)
+    if entry is not None and entry[0] == fingerprint:
+        return entry[1]
+    value = build()
+    _cache[name] = (fingerprint, value)
+    return value
+
+
+def invalidate(name=None):
+    if name is None:
+        _cache.clear()
+    else:
+        _cache.pop(name, None)
@@ -0,0 +1,63 @@
+from collections import namedtuple
+
+Decision = namedtuple("Decision", ["group", "floating"])
+
+
+def _matches(value, candidates):
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return value in candidates
+    return any(c is not None and value.match(c) for c in candidates)
+
+
+class Rule:
+    # wm_class and title are exact strings or compiled regexes, like Match
+    def __init__(self, wm_class=None, title=None, floating=False, group=None):
+        self.wm_class = wm_class
+        self.title = title
+        self.floating = floating
+        self.group = group
+
+    def matches(self, wm_classes, title):
+        return _matches(self.wm_class, wm_classes) and _matches(self.title, [title])
+
+
+class RuleEngine:
+    def __init__(self, rules):
+        self.rules = list(rules)
+        # exact rules are found by hash lookup, only patterns get scanned
+        self.by_class = {}
+        self.by_title = {}
+        self.patterns = []
+        for index, rule in enumerate(self.rules):
+            entry = (index, rule)
+            if isinstance(rule.wm_class, str):
+                self.by_class.setdefault(rule.wm_class, []).append(entry)
+            elif isinstance(rule.title, str):
+                self.by_title.setdefault(rule.title, []).append(entry)
+            else:
+                self.patterns.append(entry)
+
+    def match(self, wm_classes, title):
+        candidates = dict(self.patterns)
+        for wm_class in wm_classes:
+            candidates.update(self.by_class.get(wm_class, []))
+        candidates.update(self.by_title.get(title, []))
+        return [
+            rule
+            for _, rule in sorted(candidates.items())
+            if rule.matches(wm_classes, title)
+        ]
+
+    def decide(self, window):
+        # every property is fetched from the X server once per window
+        wm_classes = window.get_wm_class() or []
+        title = window.name
+        floating = bool(window.window.get_wm_transient_for())
+        group = None
+        for rule in self.match(wm_classes, title):
+            floating = floating or rule.floating
+            if group is None:
+                group = rule.group
+        return Decision(group, floating)
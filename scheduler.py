@@ -0,0 +1,155 @@
+import math
+import time
+
+from libqtile import hook, qtile
+from libqtile.log_utils import logger
+
+# all jobs wake on this grid so timers that are due together share a wakeup
+BASE_TICK = 1.0
+# how much slower jobs run while on battery or while their screen is covered
+BATTERY_BACKOFF = 2
+OBSCURED_BACKOFF = 10
+
+
+class Job:
+    def __init__(self, callback, interval, screen=None, name=None):
+        self.callback = callback
+        self.interval = interval
+        # None means the job feeds every screen
+        self.screen = screen
+        self.name = name
+        self.next_due = 0.0
+
+
+# reload_config re-executes this module in place and doesn't fire
+# startup_complete again. Keep the jobs, their owners unregister or replace
+# them, and only drop the previous timer.
+if globals().get("_timer") is not None:
+    _timer.cancel()
+
+_jobs = globals().get("_jobs", [])
+_visible_callbacks = []
+_timer = None
+_on_battery = False
+_obscured = set()
+
+
+def _next_due(now, period):
+    return math.floor(now / BASE_TICK) * BASE_TICK + period
+
+
+def backoff(screen=None):
+    factor = BATTERY_BACKOFF if _on_battery else 1
+    if screen is None:
+        covered = qtile is not None and len(_obscured) >= len(qtile.screens)
+    else:
+        covered = screen in _obscured
+    if covered:
+        factor = max(factor, OBSCURED_BACKOFF)
+    return factor
+
+
+def is_obscured(screen):
+    return screen in _obscured
+
+
+def register(callback, interval, screen=None, name=None):
+    # a named job replaces the one registered under that name before, so a
+    # module can register when it is (re-)executed
+    if name is not None:
+        _jobs[:] = [job for job in _jobs if job.name != name]
+    job = Job(callback, interval, screen, name)
+    _jobs.append(job)
+    _reschedule()
+    return job
+
+
+def unregister(job):
+    try:
+        _jobs.remove(job)
+    except ValueError:
+        pass
+    _reschedule()
+
+
+def on_visible(callback):
+    _visible_callbacks.append(callback)
+
+
+def remove_on_visible(callback):
+    try:
+        _visible_callbacks.remove(callback)
+    except ValueError:
+        pass
+
+
+def _run():
+    global _timer
+    _timer = None
+    now = time.time()
+    try:
+        for job in list(_jobs):
+            if job.next_due <= now:
+                # due again on its own schedule even if it fails this time
+                job.next_due = _next_due(now, job.interval * backoff(job.screen))
+                try:
+                    job.callback()
+                except Exception:
+                    logger.exception(f"Scheduled job {job.name or job.callback} failed")
+    finally:
+        # one bad job must not stop the loop the other jobs share
+        _reschedule()
+
+
+def _reschedule():
+    global _timer
+    if _timer is not None:
+        _timer.cancel()
+        _timer = None
+    if not _jobs or qtile is None:
+        # nothing to run, or the config is only being checked
+        return
+    delay = max(min(job.next_due for job in _jobs) - time.time(), 0)
+    _timer = qtile.call_later(delay, _run)
+
+
+def set_on_battery(on_battery):
+    global _on_battery
+    if on_battery == _on_battery:
+        return
+    _on_battery = on_battery
+    if not on_battery:
+        _wake(None)
+
+
+def _wake(screen):
+    # run the jobs for this screen now instead of waiting out the backoff
+    for job in _jobs:
+        if job.screen is None or job.screen == screen:
+            job.next_due = 0.0
+    for callback in _visible_callbacks:
+        callback(screen)
+    _reschedule()
+
+
+@hook.subscribe.float_change
+@hook.subscribe.focus_change
+@hook.subscribe.setgroup
+@hook.subscribe.layout_change
+def update_obscured(*args):
+    if qtile is None:
+        return
+    obscured = set()
+    for screen in qtile.screens:
+        group = screen.group
+        if group and any(w.fullscreen and not w.minimized for w in group.windows):
+            obscured.add(screen.index)
+    revealed = _obscured - obscured
+    _obscured.clear()
+    _obscured.update(obscured)
+    for screen in revealed:
+        _wake(screen)
+
+
+# jobs kept over a reload need a timer from this module
+_reschedule()
@@ -0,0 +1,143 @@
+import json
+import time
+from pathlib import Path
+
+from libqtile import hook, qtile
+from libqtile.backend import base
+from libqtile.log_utils import logger
+from libqtile.utils import get_cache_dir
+
+from batch import batch
+
+snapshot_file = Path(get_cache_dir()) / "session.json"
+# only restore snapshots taken just before this start, not after a reboot
+SNAPSHOT_MAX_AGE = 300
+
+# True until the first startup has finished managing the existing windows;
+# kept when reload_config re-executes this module
+_restoring = globals().get("_restoring", True)
+
+
+def restoring():
+    return _restoring
+
+
+def take_snapshot():
+    groups = {}
+    for group in qtile.groups:
+        state = {"layout": group.layout.name}
+        for layout in group.layouts:
+            if layout.name == "columns":
+                state["num_columns"] = layout.num_columns
+        groups[group.name] = state
+
+    windows = []
+    for window in qtile.windows_map.values():
+        if not isinstance(window, base.Window) or window.group is None:
+            continue
+        windows.append(
+            {
+                "wid": window.wid,
+                "wm_class": window.get_wm_class(),
+                "pid": window.get_pid(),
+                "group": window.group.name,
+                "floating": window.floating,
+            }
+        )
+
+    current = qtile.current_window
+    return {
+        "time": time.time(),
+        "screens": [screen.group.name for screen in qtile.screens],
+        "current_screen": qtile.current_screen.index,
+        "groups": groups,
+        "windows": windows,
+        "focused": current.wid if current else None,
+    }
+
+
+# only a restart comes back to the same X session, a snapshot taken on
+# shutdown would be restored onto the next login's windows
+@hook.subscribe.restart
+def save():
+    try:
+        snapshot_file.write_text(json.dumps(take_snapshot(), separators=(",", ":")))
+    except Exception:
+        logger.exception("Unable to save session snapshot")
+
+
+def load():
+    try:
+        snapshot = json.loads(snapshot_file.read_text())
+        snapshot_file.unlink()
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        logger.exception("Unable to read session snapshot")
+        return None
+    if time.time() - snapshot.get("time", 0) > SNAPSHOT_MAX_AGE:
+        return None
+    return snapshot
+
+
+def _find_window(state, by_wid, by_owner):
+    window = by_wid.get(state["wid"])
+    if window is None:
+        # the X window went away, fall back to the same client by class and pid
+        window = by_owner.get((tuple(state["wm_class"] or ()), state["pid"]))
+    return window
+
+
+def restore(snapshot):
+    windows = [w for w in qtile.windows_map.values() if isinstance(w, base.Window)]
+    by_wid = {w.wid: w for w in windows}
+    by_owner = {(tuple(w.get_wm_class() or ()), w.get_pid()): w for w in windows}
+
+    with batch():
+        for name, state in snapshot["groups"].items():
+            group = qtile.groups_map.get(name)
+            if group is None:
+                continue
+            if group.layout.name != state["layout"]:
+                group.layout = state["layout"]
+
+        for state in snapshot["windows"]:
+            window = _find_window(state, by_wid, by_owner)
+            if window is None or state["group"] not in qtile.groups_map:
+                continue
+            window.togroup(state["group"])
+            if window.floating != state["floating"]:
+                window.floating = state["floating"]
+
+        # after the windows are back, num_columns alone only applies to
+        # windows added later
+        for name, state in snapshot["groups"].items():
+            group = qtile.groups_map.get(name)
+            if group is None or "num_columns" not in state:
+                continue
+            for layout in group.layouts:
+                if layout.name == "columns":
+                    layout.set_num_columns(state["num_columns"])
+            group.layout_all()
+
+        for index, name in enumerate(snapshot["screens"]):
+            if index < len(qtile.screens) and name in qtile.groups_map:
+                qtile.groups_map[name].toscreen(index)
+
+    qtile.focus_screen(snapshot["current_screen"], warp=False)
+    focused = by_wid.get(snapshot["focused"])
+    if focused is not None and focused.group is not None:
+        focused.group.focus(focused, warp=False)
+
+
+@hook.subscribe.startup_complete
+def _restore():
+    global _restoring
+    _restoring = False
+    snapshot = load()
+    if snapshot is None:
+        return
+    try:
+        restore(snapshot)
+    except Exception:
+        logger.exception("Unable to restore session snapshot")
@@ -0,0 +1,111 @@
+from collections import OrderedDict
+
+from libqtile import hook, qtile
+from libqtile.widget import tasklist
+from qtile_extras.widget import modify
+
+# text widths kept for the titles seen most recently, shared by every bar
+MAX_WIDTHS = 512
+
+# wid -> whether the window belongs in a task list. On x11 finding out takes
+# two round trips per window, the stock TaskList asks again on every redraw
+# of every bar. Kept over a reload, the windows are still the same.
+_listed = globals().get("_listed", {})
+# group name -> (group.windows when last filtered, the listed ones)
+_models = {}
+# (text, font, fontsize, markup) -> text width in pixels
+_widths = OrderedDict()
+
+
+def listed(window):
+    listed = _listed.get(window.wid)
+    if listed is None:
+        listed = True
+        if qtile.core.name == "x11":
+            wm_states = window.window.get_property("_NET_WM_STATE", "ATOM", unpack=int)
+            skip_taskbar = qtile.core.conn.atoms["_NET_WM_STATE_SKIP_TASKBAR"]
+            listed = (
+                window.window.get_wm_type() in ("normal", None)
+                and skip_taskbar not in list(wm_states)
+            )
+        _listed[window.wid] = listed
+    return listed
+
+
+def group_tasks(group):
+    # the group's windows only change on add, remove and reorder, every bar
+    # showing the group gets the same list until one of those happens
+    windows = tuple(group.windows)
+    model = _models.get(group.name)
+    if model is None or model[0] != windows:
+        model = (windows, [w for w in windows if listed(w)])
+        _models[group.name] = model
+    return model[1]
+
+
+def text_width(drawer, text, font, fontsize, markup):
+    key = (text, font, fontsize, markup)
+    width = _widths.get(key)
+    if width is None:
+        width, _ = drawer.max_layout_size([text], font, fontsize, markup=markup)
+        _widths[key] = width
+        if len(_widths) > MAX_WIDTHS:
+            _widths.popitem(last=False)
+    else:
+        _widths.move_to_end(key)
+    return width
+
+
+@hook.subscribe.client_managed
+def _client_managed(window):
+    # the window type and state are set by now, look again
+    _listed.pop(window.wid, None)
+
+
+@hook.subscribe.client_killed
+def _client_killed(window):
+    _listed.pop(window.wid, None)
+
+
+class TaskList(tasklist.TaskList):
+    # The stock TaskList on each bar filters its group's windows over X and
+    # re-measures every title on every hook, on every bar. This one shares the
+    # filtered list per group, measures each title once, and only redraws a
+    # bar when something it shows changed.
+    def __init__(self, **config):
+        tasklist.TaskList.__init__(self, **config)
+        self.shown = None
+
+    @property
+    def windows(self):
+        return group_tasks(self.bar.screen.group)
+
+    def box_width(self, text):
+        width = text_width(self.drawer, text, self.font, self.fontsize, self.markup)
+        return width + 2 * (self.padding_x + self.borderwidth)
+
+    def tasks_key(self):
+        group = self.bar.screen.group
+        return tuple(
+            (w.wid, w.name, w.urgent, w.floating, w.minimized, w.maximized)
+            for w in self.windows
+        ) + (group.current_window and group.current_window.wid,)
+
+    def update(self, window=None):
+        if window is not None and window.group is not self.bar.screen.group:
+            return
+        if self.tasks_key() != self.shown:
+            self.bar.draw()
+
+    def invalidate_cache(self, window):
+        # a new icon doesn't change the key, draw anyway
+        self.remove_icon_cache(window)
+        self.shown = None
+        self.update(window)
+
+    def draw(self):
+        self.shown = self.tasks_key()
+        tasklist.TaskList.draw(self)
+
+
+TaskList = modify(TaskList, initialise=False)
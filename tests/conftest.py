@@ -0,0 +1,21 @@
+# isort: skip_file
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# installs the fake qtile, then imports the config modules
+import bench
+import scheduler
+
+
+@pytest.fixture(scope="session")
+def qtile():
+    # the config's groups and layouts on three screens, as bench.py runs them
+    bench.build(SimpleNamespace(screens=3, windows=200))
+    # idle() would run the launcher and theme polls, tests register their own
+    scheduler._jobs.clear()
+    return bench.qtile
@@ -0,0 +1,32 @@
+import batch
+from fakeqtile import FakeWindow
+
+
+def new_window(qtile):
+    wid = 1000 + len(qtile.windows_map)
+    window = FakeWindow(qtile, wid, f"Test {wid}", ["test", "Test"])
+    qtile.windows_map[wid] = window
+    return window
+
+
+def test_defer_lays_out_a_lone_window_before_it_is_mapped(qtile, monkeypatch):
+    calls = []
+    monkeypatch.setattr(batch, "_layout_all", lambda g, warp=False: calls.append(g))
+    batch.defer(qtile)
+    new_window(qtile).togroup("1")
+    assert calls == [qtile.groups_map["1"]]
+    qtile.idle()
+    assert calls == [qtile.groups_map["1"]]
+
+
+def test_defer_batches_a_burst_until_idle(qtile, monkeypatch):
+    calls = []
+    monkeypatch.setattr(batch, "_layout_all", lambda g, warp=False: calls.append(g))
+    for name in ("1", "2", "2", "1"):
+        batch.defer(qtile)
+        new_window(qtile).togroup(name)
+    # the first window right away, the rest once per group
+    assert calls == [qtile.groups_map["1"]]
+    qtile.idle()
+    assert calls == [qtile.groups_map[name] for name in ("1", "2", "1")]
+
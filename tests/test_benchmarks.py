@@ -0,0 +1,29 @@
+# The lazy-function cases of bench.py under pytest-benchmark:
+#
+#   python -m pytest tests/test_benchmarks.py --benchmark-only
+import asyncio
+
+import pytest
+
+import bench
+
+pytest.importorskip("pytest_benchmark")
+
+# rounds for a case of scale 1, bench.py's cases scale it down where slow
+ROUNDS = 200
+
+
+@pytest.mark.parametrize("name", list(bench.cases(bench.qtile)))
+def test_lazy_function(benchmark, qtile, name):
+    func, scale = bench.cases(qtile)[name]
+
+    def settle():
+        # let batch.defer and friends commit, outside the timing
+        qtile.idle()
+        return (qtile,), {}
+
+    async def run():
+        # some cases start asyncio tasks, which need a running loop
+        benchmark.pedantic(func, setup=settle, rounds=max(1, int(ROUNDS * scale)))
+
+    asyncio.run(run())
@@ -0,0 +1,16 @@
+from types import SimpleNamespace
+
+import focus_history
+
+
+def test_recent_window_skips_and_forgets_moved_windows():
+    group = SimpleNamespace(name="history")
+    other = SimpleNamespace(name="elsewhere")
+    windows = [SimpleNamespace(wid=3000 + i, group=group) for i in range(4)]
+    for window in windows:
+        focus_history._remember(window, group)
+    windows[2].group = other
+    assert focus_history.recent_window(group, 0) is windows[3]
+    assert focus_history.recent_window(group, 1) is windows[1]
+    assert focus_history.recent_window(group, 3) is None
+    assert windows[2].wid not in focus_history._history["history"]
@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+import geometry
+from fakeqtile import FakeWindow
+
+
+def make_column(qtile, tops):
+    clients = []
+    for i, top in enumerate(tops):
+        window = FakeWindow(qtile, 2000 + i, f"Test {i}", ["test", "Test"])
+        window.y, window.height = top, 100
+        clients.append(window)
+    return SimpleNamespace(clients=clients, heights={w: 100 for w in clients})
+
+
+def test_window_at_only_rebuilds_when_the_column_changed(qtile, monkeypatch):
+    group = SimpleNamespace(name="geometry")
+    column = make_column(qtile, [0, 100, 300])
+    builds = []
+    build_index = geometry._build_index
+    monkeypatch.setattr(
+        geometry, "_build_index", lambda *args: builds.append(1) or build_index(*args)
+    )
+    assert geometry.window_at(group, column, 150, 0) == (1, column.clients[1])
+    # the gap between the second and third window
+    assert geometry.window_at(group, column, 250, 0) is None
+    assert geometry.window_at(group, column, 250, 0) is None
+    assert len(builds) == 1
+
+    # grow_down without a hook
+    column.heights[column.clients[1]] = 200
+    column.clients[1].height = 200
+    assert geometry.window_at(group, column, 250, 0) == (1, column.clients[1])
+    assert len(builds) == 2
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+import launcher
+
+PATH = "/test/bin"
+APPS = "/test/applications"
+
+
+@pytest.fixture
+def tables(monkeypatch):
+    dirs = {
+        PATH: (
+            None,
+            [
+                (name, name, "run", f"run:{name}")
+                for name in ("fire", "firefox", "xfireworks", "foot", "fzf")
+            ],
+        ),
+        APPS: (
+            None,
+            [("Firefox Web Browser", "firefox", "app", "app:firefox.desktop")],
+        ),
+    }
+    monkeypatch.setattr(launcher, "_bin_dirs", [PATH])
+    monkeypatch.setattr(launcher, "_app_dirs", [APPS])
+    monkeypatch.setattr(launcher, "_tables", launcher.build_tables(dirs))
+    monkeypatch.setattr(launcher, "_launches", {})
+    return launcher._tables
+
+
+def names(entries):
+    return [entry.name for entry in entries]
+
+
+def test_search_ranks_exact_then_prefix_then_substring(tables):
+    assert names(launcher.search("run", "fire")) == ["fire", "firefox", "xfireworks"]
+
+
+def test_search_falls_back_to_characters_in_order(tables):
+    assert names(launcher.search("run", "ffx")) == ["firefox"]
+    assert launcher.search("run", "qqq") == []
+
+
+def test_search_is_case_insensitive_per_kind(tables):
+    assert names(launcher.search("app", "  WEB ")) == ["Firefox Web Browser"]
+    assert launcher.search("app", "foot") == []
+
+
+def test_search_without_query_lists_launches_by_frecency(tables):
+    now = time.time()
+    launcher._launches.update(
+        {"run:foot": (1, now), "run:fzf": (5, now), "run:gone": (9, now)}
+    )
+    assert names(launcher.search("run", "")) == ["fzf", "foot"]
+
+
+def test_search_prefers_launched_entries(tables):
+    launcher._launches["run:firefox"] = (20, time.time())
+    assert names(launcher.search("run", "fire", 1)) == ["firefox"]
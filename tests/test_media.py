@@ -0,0 +1,15 @@
+import asyncio
+
+import media
+from variables import max_volume
+
+
+def test_volume_goes_past_100_percent_up_to_max_volume(qtile):
+    pulse = media.pulse.pulse
+    media.pulse.default_sink.volume.value_flat = 0.95
+    media._pending_delta = 10
+    asyncio.run(media._flush_volume())
+    assert pulse.calls[-1] == ("volume", 1.05)
+    media._pending_delta = 100
+    asyncio.run(media._flush_volume())
+    assert pulse.calls[-1] == ("volume", max_volume)
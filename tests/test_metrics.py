@@ -0,0 +1,16 @@
+import metrics
+
+
+def test_sample_keeps_values_of_unreadable_sources(tmp_path):
+    sampler = metrics.Sampler()
+    sampler.snapshot = sampler.sample()
+    first = sampler.snapshot
+    for name in ("stat", "meminfo", "net_dev"):
+        source = getattr(sampler, name)
+        source.close()
+        source.path = tmp_path / "missing"
+    snapshot = sampler.sample()
+    assert snapshot.cpu == first.cpu
+    assert snapshot.memory == first.memory
+    assert (snapshot.net_down, snapshot.net_up) == (first.net_down, first.net_up)
+    assert sampler._cpu is not None
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import nightscout
+import scheduler
+
+ETAG = '"v1"'
+BODY = json.dumps([{"date": 0, "sgv": 100, "direction": "Flat", "delta": 1}])
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = BODY.encode()
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=0):
+    server = HTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stop(server):
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetcher_survives_a_refused_connection():
+    server = serve()
+    port = server.server_address[1]
+    url = f"http://127.0.0.1:{port}/api/v1/entries/sgv?count=1"
+    fetcher = nightscout.Fetcher(url, 150)
+    seen = []
+    fetcher.subscribe(seen.append)
+    try:
+        asyncio.run(fetcher.fetch())
+        assert seen[-1].error is None
+        assert seen[-1].etag == ETAG
+        assert seen[-1].data == json.loads(BODY)
+
+        # the ETag goes back to the server, which answers 304
+        fetched = seen[-1].fetched
+        asyncio.run(fetcher.fetch())
+        assert seen[-1].error is None
+        assert seen[-1].data == json.loads(BODY)
+        assert seen[-1].fetched >= fetched
+
+        stop(server)
+        asyncio.run(fetcher.fetch())
+        assert seen[-1].error
+        # the last good value is kept, and so is the polling job
+        assert seen[-1].data == json.loads(BODY)
+        assert fetcher.conn is None
+        assert fetcher.job in scheduler._jobs
+
+        server = serve(port)
+        asyncio.run(fetcher.fetch())
+        assert seen[-1].error is None
+        assert seen[-1].data == json.loads(BODY)
+    finally:
+        fetcher.close()
+        stop(server)
+    assert fetcher.job is None
@@ -0,0 +1,40 @@
+import logging
+
+import scheduler
+
+
+def test_a_failing_job_does_not_stop_the_others(qtile, monkeypatch, caplog):
+    monkeypatch.setattr(scheduler, "_jobs", [])
+    ran = []
+
+    def broken():
+        raise RuntimeError("broken")
+
+    bad = scheduler.register(broken, 5, name="broken")
+    good = scheduler.register(lambda: ran.append(1), 5)
+    with caplog.at_level(logging.ERROR, logger="libqtile"):
+        scheduler._run()
+    assert ran == [1]
+    assert "broken" in caplog.text
+    # both are due again on their own schedule, and the loop goes on
+    assert bad.next_due > 0 and good.next_due > 0
+    assert scheduler._timer is not None
+    scheduler.unregister(bad)
+    scheduler.unregister(good)
+    assert scheduler._timer is None
+
+
+def test_a_job_raising_keeps_its_interval(qtile, monkeypatch):
+    monkeypatch.setattr(scheduler, "_jobs", [])
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        raise OSError("flaky")
+
+    job = scheduler.register(flaky, 60)
+    scheduler._run()
+    scheduler._run()
+    # not due again until its interval has passed
+    assert calls == [1]
+    scheduler.unregister(job)
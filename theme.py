@@ -1,15 +1,196 @@
+import hashlib
 import json
+import re
+import weakref
+from collections import namedtuple
+from functools import lru_cache
 from pathlib import Path
+from types import MappingProxyType
+
+from libqtile import hook, qtile
+from libqtile.log_utils import logger
+
+import scheduler
+from reload_cache import cached, file_fingerprint
 
 qtile_dir = Path("~/.config/qtile").expanduser()
 
+REQUIRED = (
+    "active",
+    "active-group-foreground",
+    "background",
+    "current-group-background",
+    "foreground",
+    "inactive",
+    "other-screen-group-background",
+    "powerline-colors",
+)
+# used when the palette doesn't name an urgent colour
+DEFAULT_URGENT = "#db4b4b"
+# how far the -dimmed variants are mixed towards the background
+DIM = 0.5
+# seconds between checks of the theme file for edits
+POLL_INTERVAL = 2
+
+_hex = re.compile(r"#?([0-9a-fA-F]{3}|[0-9a-fA-F]{6}|[0-9a-fA-F]{8})")
+
+# colors: key -> #rrggbb, for X borders and anything else outside cairo
+# rgba: key -> (r, g, b, alpha), which qtile's drawer uses without parsing
+# powerline: [{"fg": rgba, "bg": rgba}, ...]
+Theme = namedtuple("Theme", ["colors", "rgba", "powerline"])
+
+
+def parse_colour(value):
+    match = _hex.fullmatch(value) if isinstance(value, str) else None
+    if match is None:
+        raise ValueError(f"invalid colour {value!r}")
+    digits = match.group(1)
+    if len(digits) == 3:
+        digits = "".join(c * 2 for c in digits)
+    r, g, b = (int(digits[i : i + 2], 16) for i in (0, 2, 4))
+    alpha = int(digits[6:8], 16) / 255 if len(digits) == 8 else 1.0
+    return (r, g, b, alpha)
+
+
+def to_hex(rgba):
+    # X colour allocation only understands #rrggbb, the alpha stays in rgba
+    r, g, b, _ = rgba
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def mix(colour, other, amount):
+    r, g, b = (round(c + (o - c) * amount) for c, o in zip(colour[:3], other[:3]))
+    return (r, g, b, colour[3])
+
+
+def compile_theme(palette):
+    missing = [key for key in REQUIRED if key not in palette]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    rgba = {
+        key: parse_colour(value)
+        for key, value in palette.items()
+        if key != "powerline-colors"
+    }
+    rgba.setdefault("urgent", parse_colour(DEFAULT_URGENT))
+    background = rgba["background"]
+    for key, value in list(rgba.items()):
+        if key != "background":
+            rgba[f"{key}-dimmed"] = mix(value, background, DIM)
+
+    powerline = []
+    for i, pair in enumerate(palette["powerline-colors"]):
+        rgba[f"powerline-{i}-fg"] = parse_colour(pair["fg"])
+        rgba[f"powerline-{i}-bg"] = parse_colour(pair["bg"])
+        powerline.append(
+            MappingProxyType(
+                {"fg": rgba[f"powerline-{i}-fg"], "bg": rgba[f"powerline-{i}-bg"]}
+            )
+        )
+    if not powerline:
+        raise ValueError("powerline-colors is empty")
+
+    return Theme(
+        MappingProxyType({key: to_hex(value) for key, value in rgba.items()}),
+        MappingProxyType(rgba),
+        tuple(powerline),
+    )
+
+
+def load_theme(theme):
+    # keyed by content, so a rewrite of the same palette compiles nothing
+    data = theme.read_bytes()
+    digest = hashlib.sha1(data).hexdigest()
+    return cached("theme", digest, lambda: compile_theme(json.loads(data)))
+
+
 # theme file generated by nixos
 theme = qtile_dir / "colors.json"
 if not theme.exists():
     theme = theme.with_name("default_colors.json")
-with open(theme) as theme_file:
-    colors = json.load(theme_file)
-powerline_colors = colors["powerline-colors"]
+_fingerprint = file_fingerprint(theme)
+try:
+    compiled = load_theme(theme)
+except (OSError, ValueError, KeyError, TypeError) as e:
+    logger.error(f"Invalid theme {theme}, using the default colors: {e}")
+    compiled = load_theme(theme.with_name("default_colors.json"))
+
+# mutable copies, updated in place when the theme file changes
+colors = dict(compiled.colors)
+rgba = dict(compiled.rgba)
+powerline_colors = list(compiled.powerline)
+
+# (object, attribute, key) for everything painted from the theme
+_painted = []
+_listeners = []
+
+
+def paint(obj, **attributes):
+    for attribute, key in attributes.items():
+        setattr(obj, attribute, rgba[key])
+        _painted.append((weakref.ref(obj), attribute, key))
+    return obj
+
+
+def on_change(callback):
+    _listeners.append(callback)
+    return callback
+
+
+def apply(new):
+    global compiled
+    compiled = new
+    colors.clear()
+    colors.update(new.colors)
+    rgba.clear()
+    rgba.update(new.rgba)
+    powerline_colors[:] = new.powerline
+
+    alive = []
+    for ref, attribute, key in _painted:
+        obj = ref()
+        if obj is None:
+            continue
+        if key in rgba:
+            setattr(obj, attribute, rgba[key])
+        alive.append((ref, attribute, key))
+    _painted[:] = alive
+
+    for callback in _listeners:
+        try:
+            callback()
+        except Exception:
+            logger.exception("Error applying the new theme")
+
+
+def _check():
+    global _fingerprint
+    fingerprint = file_fingerprint(theme)
+    if fingerprint == _fingerprint:
+        return
+    _fingerprint = fingerprint
+    try:
+        new = load_theme(theme)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Ignoring invalid theme {theme}: {e}")
+        return
+    if new is not compiled:
+        apply(new)
+
+
+# registered on every (re-)execution, startup_complete only fires once
+scheduler.register(_check, POLL_INTERVAL, name="theme")
+
+
+@hook.subscribe.startup_complete
+def _cache_colours():
+    if qtile.core.name == "x11":
+        # every border paint asks the X server to allocate the colour again,
+        # the few theme colours only need to be looked up once
+        conn = qtile.core.conn
+        if not hasattr(conn.color_pixel, "cache_info"):
+            conn.color_pixel = lru_cache(maxsize=64)(conn.color_pixel)
+
 
 # active window border
 # inactive window border
@@ -0,0 +1,117 @@
+import time
+from collections import OrderedDict
+
+from libqtile import hook, qtile
+from libqtile.log_utils import logger
+
+from group_config import go_to_group
+from variables import urgency_policies, urgency_policy
+
+# a window has to stay urgent this long before anything happens, so a
+# client flipping the hint on and off does nothing
+DEBOUNCE = 0.5
+# at most one jump per this many seconds, however many windows ask
+MIN_INTERVAL = 1.0
+# "idle" windows wait until nothing was focused for this long
+IDLE_AFTER = 5.0
+# a client can't grow the queue past this, the oldest entries are dropped
+MAX_PENDING = 16
+
+POLICIES = ("jump", "highlight", "idle")
+for _name in {urgency_policy, *urgency_policies.values()}:
+    if _name not in POLICIES:
+        logger.warning(f"Unknown urgency policy {_name}, treated as highlight")
+
+# reload_config re-executes this module in place, drop the previous timer
+if globals().get("_timer") is not None:
+    _timer.cancel()
+
+# wid -> (window, urgent since), in the order they became urgent
+_pending = OrderedDict()
+_timer = None
+_last_jump = 0.0
+_last_activity = 0.0
+_jumping = False
+
+
+def policy(window):
+    wm_class = window.get_wm_class() or ()
+    for name in wm_class:
+        if name.lower() in urgency_policies:
+            return urgency_policies[name.lower()]
+    return urgency_policy
+
+
+def _schedule(delay):
+    global _timer
+    if _timer is not None:
+        return
+    _timer = qtile.call_later(max(delay, 0), _process)
+
+
+def _jump(window):
+    global _last_jump, _jumping
+    _last_jump = time.monotonic()
+    # our own focus changes don't count as the user being active
+    _jumping = True
+    try:
+        go_to_group(qtile, window.group.name)
+        window.focus(False)
+    finally:
+        _jumping = False
+
+
+def _process():
+    global _timer
+    _timer = None
+    now = time.monotonic()
+    wait = None
+    for wid, (window, since) in list(_pending.items()):
+        if not window.urgent or window.group is None or window is qtile.current_window:
+            del _pending[wid]
+            continue
+        due = since + DEBOUNCE
+        action = policy(window)
+        if action == "idle":
+            due = max(due, _last_activity + IDLE_AFTER)
+        elif action != "jump":
+            # the GroupBox already shows the urgent group
+            del _pending[wid]
+            continue
+        due = max(due, _last_jump + MIN_INTERVAL)
+        if due > now:
+            wait = due - now if wait is None else min(wait, due - now)
+            continue
+        del _pending[wid]
+        _jump(window)
+        # anything else waits for the next slot
+        wait = MIN_INTERVAL
+        break
+    if _pending and wait is not None:
+        _schedule(wait)
+
+
+@hook.subscribe.client_urgent_hint_changed
+def _urgent_hint_changed(window):
+    if not window.urgent:
+        _pending.pop(window.wid, None)
+        return
+    if window.wid in _pending:
+        # still the same request, keep its place and start time
+        return
+    _pending[window.wid] = (window, time.monotonic())
+    while len(_pending) > MAX_PENDING:
+        _pending.popitem(last=False)
+    _schedule(DEBOUNCE)
+
+
+@hook.subscribe.client_killed
+def _client_killed(window):
+    _pending.pop(window.wid, None)
+
+
+@hook.subscribe.focus_change
+def _focus_change():
+    global _last_activity
+    if not _jumping:
+        _last_activity = time.monotonic()
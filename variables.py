@@ -10,4 +10,29 @@ terminal = "kitty"
 file_manager = "pcmanfm"
 browser = "firefox"
 
+# terminals started ahead of time and kept hidden until M-e / M-b asks for
+# one, pool -> (arguments after the terminal, how many). The terminal has to
+# take --name (kitty does), 0 turns a pool off. btop keeps polling while idle.
+terminal_pools = {
+    "terminal": ([], 2),
+    "btop": (["-e", "btop"], 1),
+}
+
 widget_style = "powerline"
+# e.g. "http://localhost:1337/api/v1/entries/sgv?count=1", None hides the widget
+nightscout_url = None
+
+# commands started next to autostart.sh, per host
+autostart_commands = {
+    "tachi": [],
+}.get(hostname, [])
+
+# what an urgent window does: "jump" to it, "highlight" its group only, or
+# jump once nothing was focused for a while ("idle"); per wm_class overrides
+urgency_policy = "jump"
+urgency_policies = {
+    # "discord": "idle",
+}
+
+# highest volume the volume keys go to, 1.0 is 100%
+max_volume = 1.5